@@ -1,67 +1,134 @@
-from customar_list_gen import script_capture as cpt
-from selenium import webdriver
-import chromedriver_binary
-import time
-
-def browser_controller():
-    results = []
-
-    driver = webdriver.Chrome()
-    driver.get("https://fumasalse.com/search/?search_from_top=1&tab_btn=on&tab_btn_menu1=on&chu_code%5B%5D=28&chu_code%5B%5D=29&chu_code%5B%5D=31&tab_btn_data=on&listed=1&jugyoinsu%5B%5D=5&jugyoinsu%5B%5D=6")
-
-    time.sleep(3)
-
-    #for i in range(5):
-    url = driver.current_url
-    time.sleep(1)
-    result = cpt(url)
-    for i in range(len(result)):
-        results.append(result[i])
-    driver.execute_script("window.scrollTo(0, document.body.scrollHeight);")
-    time.sleep(1)
-    xp = '//*[@id="contents_main_box2"]/div[52]/div[1]/span/a[{}]'.format(3)
-    driver.find_element_by_xpath(xp).click()
-    time.sleep(3)
-
-    url = driver.current_url
-    time.sleep(1)
-    result = cpt(url)
-    for i in range(len(result)):
-        results.append(result[i])
-    driver.execute_script("window.scrollTo(0, document.body.scrollHeight);")
-    time.sleep(1)
-    xp = '//*[@id="contents_main_box2"]/div[52]/div[1]/span/a[{}]'.format(5)
-    driver.find_element_by_xpath(xp).click()
-    time.sleep(3)
-
-    url = driver.current_url
-    time.sleep(1)
-    result = cpt(url)
-    for i in range(len(result)):
-        results.append(result[i])
-    driver.execute_script("window.scrollTo(0, document.body.scrollHeight);")
-    time.sleep(1)
-    xp = '//*[@id="contents_main_box2"]/div[52]/div[1]/span/a[{}]'.format(6)
-    driver.find_element_by_xpath(xp).click()
-    time.sleep(3)
-
-    url = driver.current_url
-    time.sleep(1)
-    result = cpt(url)
-    for i in range(len(result)):
-        results.append(result[i])
-    driver.execute_script("window.scrollTo(0, document.body.scrollHeight);")
-    time.sleep(1)
-    xp = '//*[@id="contents_main_box2"]/div[52]/div[1]/span/a[{}]'.format(6)
-    driver.find_element_by_xpath(xp).click()
-    time.sleep(3)
-
-    url = driver.current_url
-    time.sleep(1)
-    result = cpt(url)
-    for i in range(len(result)):
-        results.append(result[i])
-
-    #print(results)
-
-    return results
+import json
+import logging
+import sqlite3
+import time
+from concurrent.futures import Future
+from customar_list_gen import PageFetcher, CompanyEntry, DEFAULT_WORKERS, DEFAULT_PER_HOST
+
+logger = logging.getLogger(__name__)
+
+# 検索条件（中部3県・上場・従業員数）の検索結果1ページ目
+START_URL = "https://fumasalse.com/search/?search_from_top=1&tab_btn=on&tab_btn_menu1=on&chu_code%5B%5D=28&chu_code%5B%5D=29&chu_code%5B%5D=31&tab_btn_data=on&listed=1&jugyoinsu%5B%5D=5&jugyoinsu%5B%5D=6"
+
+# 取得するページ数の既定値（以前のブラウザ操作と同じ5ページ）
+DEFAULT_MAX_PAGES = 5
+
+# クロールの途中経過（ページごとの検索結果とページ送りのリンク）
+# 1ページ処理するごとに保存し、中断後の再実行では完了済みのページを取得せずに保存済みの結果を使う
+# 開始URLが前回と異なる場合は途中経過を破棄する
+class CrawlCheckpoint:
+    def __init__(self, path, start_url):
+        self.path = path
+        self.failed = 0  # 今回の実行で取得できなかったページ数
+        self.conn = sqlite3.connect(path)
+        self.conn.execute("CREATE TABLE IF NOT EXISTS meta (name TEXT PRIMARY KEY, value TEXT)")
+        self.conn.execute("CREATE TABLE IF NOT EXISTS pages (page_no INTEGER PRIMARY KEY, url TEXT, entries TEXT, "
+                          "next_url TEXT, page_links TEXT, done_at REAL)")
+        row = self.conn.execute("SELECT value FROM meta WHERE name = 'start_url'").fetchone()
+        if row is None or row[0] != start_url:
+            self.conn.execute("DELETE FROM pages")
+            self.conn.execute("INSERT OR REPLACE INTO meta (name, value) VALUES ('start_url', ?)", (start_url,))
+        self.conn.commit()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    # 完了済みのページ数
+    def count(self):
+        return self.conn.execute("SELECT COUNT(*) FROM pages").fetchone()[0]
+
+    # 完了済みのページの結果 (検索結果のリスト, 次のページのURL, ページ番号リンク)。未完了ならNone
+    def get(self, page_no, url):
+        row = self.conn.execute("SELECT entries, next_url, page_links FROM pages WHERE page_no = ? AND url = ?",
+                                (page_no, url)).fetchone()
+        if row is None:
+            return None
+        entries = [CompanyEntry(*entry) for entry in json.loads(row[0])]
+        page_links = {int(no): link for no, link in json.loads(row[2]).items()}
+        return entries, row[1], page_links
+
+    def put(self, page_no, url, result):
+        entries, next_url, page_links = result
+        self.conn.execute("INSERT OR REPLACE INTO pages (page_no, url, entries, next_url, page_links, done_at) "
+                          "VALUES (?, ?, ?, ?, ?, ?)",
+                          (page_no, url, json.dumps([list(entry) for entry in entries], ensure_ascii=False),
+                           next_url, json.dumps(page_links), time.time()))
+        self.conn.commit()
+
+    # クロールを最後まで出力できたら途中経過を破棄する
+    def clear(self):
+        self.conn.execute("DELETE FROM pages")
+        self.conn.commit()
+
+    def close(self):
+        self.conn.close()
+
+# 検索結果のページ送りリンクをHTMLからたどり、ページごとの検索結果（CompanyEntry）のリストをページ順に返す
+# ページ送りに表示されている先のページは、前のページの処理を待たずに並行して取得する
+# max_pagesがNoneまたは0以下の場合は最終ページまで取得する
+# cache（PageCache）を指定した場合は取得済みのページを再検証して使う
+# checkpoint（CrawlCheckpoint）を指定した場合は完了したページを記録し、完了済みのページは取得しない
+# 取得できなかったページは記録しないため、再実行すると取得し直す
+def crawl_pages(start_url=START_URL, max_pages=DEFAULT_MAX_PAGES, workers=DEFAULT_WORKERS, per_host=DEFAULT_PER_HOST,
+                cache=None, checkpoint=None):
+    limit = max_pages if max_pages and max_pages > 0 else None
+    with PageFetcher(workers, per_host, cache) as fetcher:
+        # 完了済みのページは保存済みの結果を、それ以外は取得を開始したFutureを返す
+        def submit(url, no):
+            result = checkpoint.get(no, url) if checkpoint else None
+            if result is None:
+                return fetcher.submit(url, no)
+            future = Future()
+            future.set_result(result)
+            return future
+
+        pending = {1: (start_url, submit(start_url, 1))}
+        requested = {start_url}
+        page_no = 1
+        while page_no in pending:
+            url, future = pending.pop(page_no)
+            try:
+                entries, next_url, page_links = future.result()
+                if checkpoint:
+                    checkpoint.put(page_no, url, (entries, next_url, page_links))
+            except Exception as e:
+                # 先読み済みの次のページがあれば続ける
+                logger.error(f"ページの取得失敗 ({url}): {str(e)}")
+                entries, next_url, page_links = [], None, {}
+                if checkpoint:
+                    checkpoint.failed += 1
+            yield entries
+            if limit and page_no >= limit:
+                break
+
+            links = dict(page_links)
+            if next_url:
+                links[page_no + 1] = next_url
+            for no, link in sorted(links.items()):
+                if no <= page_no or (limit and no > limit) or no in pending or link in requested:
+                    continue
+                pending[no] = (link, submit(link, no))
+                requested.add(link)
+            page_no += 1
+
+# 全ページの検索結果（会社名, 説明タイトル, 説明文）を1つのリストにまとめる
+def collect_companies(start_url=START_URL, max_pages=DEFAULT_MAX_PAGES, workers=DEFAULT_WORKERS, cache=None,
+                      checkpoint=None):
+    results = []
+
+    for result in crawl_pages(start_url, max_pages, workers, cache=cache, checkpoint=checkpoint):
+        results.extend(result)
+
+    return results
+
+# 全ページの会社名を1つのリストにまとめる
+def browser_controller(start_url=START_URL, max_pages=DEFAULT_MAX_PAGES, workers=DEFAULT_WORKERS, cache=None,
+                       checkpoint=None):
+    results = [entry.name for entry in collect_companies(start_url, max_pages, workers, cache, checkpoint)]
+
+    #print(results)
+
+    return results
@@ -1,17 +1,74 @@
-import openpyxl as xls
-from browser_control import browser_controller
-
-items = browser_controller()
-
-wb = xls.Workbook()
-ws = wb.active
-ws.title = "customar_list"
-
-j = 1
-
-for i in range(len(items)):
-    cell = "B{}".format(j + 1)
-    ws[cell] = items[i]
-    j = j + 1
-    
-wb.save("customar_list.xlsx")
\ No newline at end of file
+import argparse
+import logging
+import os
+import openpyxl as xls
+from browser_control import crawl_pages, CrawlCheckpoint, START_URL, DEFAULT_MAX_PAGES
+from customar_list_gen import DEFAULT_WORKERS, PageCache
+
+# ページキャッシュのパス（出力ファイルと同じ場所）
+def get_cache_path(output_path):
+    return os.path.splitext(output_path)[0] + "_page_cache.db"
+
+# クロールの途中経過のパス（出力ファイルと同じ場所）
+def get_checkpoint_path(output_path):
+    return os.path.splitext(output_path)[0] + "_crawl.db"
+
+def main():
+    parser = argparse.ArgumentParser(description="検索結果の会社名・説明をExcelに書き出す")
+    parser.add_argument("--url", default=START_URL, help="検索結果1ページ目のURL")
+    parser.add_argument("--pages", type=int, default=DEFAULT_MAX_PAGES,
+                        help=f"取得するページ数（0で最終ページまで、既定: {DEFAULT_MAX_PAGES}）")
+    parser.add_argument("--workers", type=int, default=DEFAULT_WORKERS,
+                        help=f"同時に取得するページ数（既定: {DEFAULT_WORKERS}）")
+    parser.add_argument("--output", default="customar_list.xlsx", help="出力するExcelファイル")
+    parser.add_argument("--cache", help="ページキャッシュのファイル（既定: <出力ファイル名>_page_cache.db）")
+    parser.add_argument("--no-cache", action="store_true", help="ページキャッシュを使わない")
+    parser.add_argument("--offline", action="store_true", help="通信せず、ページキャッシュに保存済みのページのみを使う")
+    parser.add_argument("--checkpoint", help="クロールの途中経過のファイル（既定: <出力ファイル名>_crawl.db）")
+    parser.add_argument("--restart", action="store_true", help="前回中断したクロールの途中経過を破棄して最初から取得する")
+    args = parser.parse_args()
+    if args.offline and args.no_cache:
+        parser.error("--offline と --no-cache は同時に指定できません")
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+
+    cache = None if args.no_cache else PageCache(args.cache or get_cache_path(args.output), offline=args.offline)
+    checkpoint = CrawlCheckpoint(args.checkpoint or get_checkpoint_path(args.output), args.url)
+    if args.restart:
+        checkpoint.clear()
+    elif checkpoint.count():
+        logging.info(f"前回の途中経過から再開します（完了済み {checkpoint.count()}ページ）")
+
+    wb = xls.Workbook()
+    ws = wb.active
+    ws.title = "customar_list"
+
+    ws["B1"] = "会社名"
+    ws["C1"] = "説明タイトル"
+    ws["D1"] = "説明"
+
+    # 検索結果は取得できたページから順に書き込む
+    j = 1
+    try:
+        for items in crawl_pages(args.url, args.pages, max(args.workers, 1), cache=cache, checkpoint=checkpoint):
+            for i in range(len(items)):
+                ws["B{}".format(j + 1)] = items[i].name
+                ws["C{}".format(j + 1)] = items[i].title
+                ws["D{}".format(j + 1)] = items[i].excerpt
+                j = j + 1
+
+        wb.save(args.output)
+
+        # すべてのページを出力できた場合のみ途中経過を破棄する（取得できなかったページは次回取得し直す）
+        if checkpoint.failed:
+            logging.warning(f"{checkpoint.failed}ページを取得できませんでした。再実行すると続きから取得します")
+        else:
+            checkpoint.clear()
+    finally:
+        checkpoint.close()
+        if cache:
+            logging.info(f"ページキャッシュ: 新規取得 {cache.stats['miss']}件, 再検証(304) {cache.stats['revalidated']}件, "
+                         f"オフライン {cache.stats['offline']}件")
+            cache.close()
+
+if __name__ == "__main__":
+    main()
@@ -1,37 +1,320 @@
-import urllib.request as req
-from bs4 import BeautifulSoup as bs
-
-def script_capture(url):
-
-    company_names = []
-    #description_title = []
-    #descriptions = []
-
-    #r = req.urlopen("https://fumasalse.com/search/?search_from_top=1&tab_btn=on&tab_btn_menu1=on&chu_code%5B%5D=28&chu_code%5B%5D=29&chu_code%5B%5D=31&tab_btn_data=on&listed=1&jugyoinsu%5B%5D=5&jugyoinsu%5B%5D=6")
-
-    r = req.urlopen(url)
-    soup = bs(r)
-    com_name = soup.find_all(class_="s_res s_coprate")
-    #des_title = soup.find_all(class_="searches__result__list__conts__text__heading")
-    #des = soup.find_all(class_="searches__result__list__conts__text__excerpt")
-
-    for i in range(len(com_name)):
-        text_com = com_name[i].get_text()
-        #text_dest = des_title[i].get_text()
-        #text_des = des[i].get_text()
-        company_names.append(str(text_com))
-        #description_title.append(text_dest)
-        #descriptions.append(text_des)
-
-    r.close()
-    
-    #result = result.get_text()
-    #print("ここから")
-    #print(company_names[0])
-    #print(description_title)
-    #print(descriptions)
-    #print("ここまで")
-
-    return company_names #description_title, descriptions
-
-#script_capture("https://fumasalse.com/search/?search_from_top=1&tab_btn=on&tab_btn_menu1=on&chu_code%5B%5D=28&chu_code%5B%5D=29&chu_code%5B%5D=31&tab_btn_data=on&listed=1&jugyoinsu%5B%5D=5&jugyoinsu%5B%5D=6")
\ No newline at end of file
+import logging
+import sqlite3
+import threading
+import time
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+from urllib.parse import urljoin, urlsplit
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from bs4 import BeautifulSoup as bs
+from bs4 import SoupStrainer
+
+# HTMLの解析にはlxmlを使う（インストールされていなければ標準のhtml.parser）
+try:
+    import lxml  # noqa: F401
+    HTML_PARSER = "lxml"
+except ImportError:
+    HTML_PARSER = "html.parser"
+
+logger = logging.getLogger(__name__)
+
+# 「次のページ」リンクとみなすリンクの文字列
+NEXT_LINK_TEXTS = ["次へ", "次のページ", "次", "次へ>", "次へ >", "次へ»", "次へ »", ">", "›", "»"]
+
+# 検索結果の会社名・説明タイトル・説明文のclass
+RESULT_NAME_CLASS = "s_res s_coprate"
+RESULT_TITLE_CLASS = "searches__result__list__conts__text__heading"
+RESULT_EXCERPT_CLASS = "searches__result__list__conts__text__excerpt"
+# 検索結果一覧の要素のclassの接頭辞（検索結果1件分の枠もこのclassを持つ）
+RESULT_BLOCK_CLASS_PREFIX = "searches__result__list"
+
+# 検索結果1件分（会社名, 説明タイトル, 説明文）
+CompanyEntry = namedtuple("CompanyEntry", ["name", "title", "excerpt"])
+
+# ページ取得の設定
+FETCH_TIMEOUT = 10  # 接続・読み込みそれぞれのタイムアウト（秒）
+FETCH_RETRIES = 3  # 接続エラー・429・5xxのリトライ回数（指数バックオフ）
+DEFAULT_WORKERS = 8  # 同時に取得するページ数
+DEFAULT_PER_HOST = 4  # 同じホストへの同時接続数の上限
+
+# ページキャッシュの設定
+CACHE_TTL = 7 * 24 * 60 * 60  # 最後に取得・再検証してからこの秒数を過ぎたページは削除する
+CACHE_MAX_BYTES = 200 * 1024 * 1024  # 合計サイズの上限（超えたら最後に使ってから長いものから削除する）
+
+# キャッシュしたページ（本文, ETag, Last-Modified）
+CachedPage = namedtuple("CachedPage", ["body", "etag", "last_modified"])
+
+# 取得したページのキャッシュ（SQLite、URLごと）
+# 2回目以降はETag/Last-Modifiedで再検証し、304なら保存済みの本文を使う
+# offline=Trueの場合は通信せず、保存済みのページのみを返す（期限切れのものも削除しない）
+class PageCache:
+    def __init__(self, path, ttl=CACHE_TTL, max_bytes=CACHE_MAX_BYTES, offline=False):
+        self.path = path
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.offline = offline
+        self.stats = {"miss": 0, "revalidated": 0, "offline": 0}
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.execute("CREATE TABLE IF NOT EXISTS pages (url TEXT PRIMARY KEY, etag TEXT, last_modified TEXT, "
+                          "body BLOB, size INTEGER, fetched_at REAL, used_at REAL)")
+        if not offline:
+            self.conn.execute("DELETE FROM pages WHERE fetched_at < ?", (time.time() - ttl,))
+        self.conn.commit()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def get(self, url):
+        with self.lock:
+            row = self.conn.execute("SELECT body, etag, last_modified FROM pages WHERE url = ?", (url,)).fetchone()
+        return CachedPage(*row) if row else None
+
+    def put(self, url, body, etag=None, last_modified=None):
+        now = time.time()
+        with self.lock:
+            self.conn.execute("INSERT OR REPLACE INTO pages (url, etag, last_modified, body, size, fetched_at, used_at) "
+                              "VALUES (?, ?, ?, ?, ?, ?, ?)", (url, etag, last_modified, body, len(body), now, now))
+            self.evict()
+            self.conn.commit()
+
+    # 304で再検証できたページの取得日時を更新する
+    def touch(self, url):
+        now = time.time()
+        with self.lock:
+            self.conn.execute("UPDATE pages SET fetched_at = ?, used_at = ? WHERE url = ?", (now, now, url))
+            self.conn.commit()
+
+    # 合計サイズが上限を超えた分を、最後に使ってから長いページから削除する
+    def evict(self):
+        total = self.conn.execute("SELECT COALESCE(SUM(size), 0) FROM pages").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        for url, size in self.conn.execute("SELECT url, size FROM pages ORDER BY used_at").fetchall():
+            self.conn.execute("DELETE FROM pages WHERE url = ?", (url,))
+            total -= size
+            if total <= self.max_bytes:
+                break
+
+    def count(self, name):
+        with self.lock:
+            self.stats[name] += 1
+
+    def close(self):
+        self.conn.close()
+
+# Keep-Alive接続を使い回すセッション（接続エラー・429・5xxは自動でリトライする）
+def create_session(pool_size=DEFAULT_WORKERS, retries=FETCH_RETRIES):
+    session = requests.Session()
+    retry = Retry(total=retries, backoff_factor=0.5, status_forcelist=[429, 500, 502, 503, 504],
+                  allowed_methods=["GET"], respect_retry_after_header=True)
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=retry)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
+
+# 単発の取得で共有するセッション
+@lru_cache(maxsize=None)
+def default_session():
+    return create_session()
+
+# ページのHTMLを取得する
+# cacheを指定した場合は保存済みのページを条件付きリクエストで再検証し、変更がなければ保存済みの本文を返す
+def fetch_page(url, session=None, timeout=FETCH_TIMEOUT, cache=None):
+    cached = cache.get(url) if cache else None
+    if cache and cache.offline:
+        if cached is None:
+            raise LookupError(f"キャッシュにないページです: {url}")
+        cache.count("offline")
+        return cached.body
+
+    headers = {}
+    if cached:
+        if cached.etag:
+            headers["If-None-Match"] = cached.etag
+        if cached.last_modified:
+            headers["If-Modified-Since"] = cached.last_modified
+    r = (session or default_session()).get(url, timeout=timeout, headers=headers)
+    if cached and r.status_code == 304:
+        cache.touch(url)
+        cache.count("revalidated")
+        return cached.body
+    r.raise_for_status()
+    if cache:
+        cache.put(url, r.content, r.headers.get("ETag"), r.headers.get("Last-Modified"))
+        cache.count("miss")
+    return r.content
+
+# 解析時に残す要素（検索結果の会社名・説明タイトル・説明文とそれを囲む枠、ページ送りのリンク）
+# それ以外の要素はツリーを作らずに読み飛ばす
+# bs4 4.13以降はallow_tag_creation、それより前はsearch_tagで判定される
+class ResultStrainer(SoupStrainer):
+    def keep(self, name, attrs):
+        classes = attrs.get("class") or ""
+        classes = set(classes if isinstance(classes, list) else classes.split())
+        if set(RESULT_NAME_CLASS.split()) <= classes:
+            return True
+        if any(c.startswith(RESULT_BLOCK_CLASS_PREFIX) for c in classes):
+            return True
+        return name in ("a", "link") and "href" in attrs
+
+    def allow_tag_creation(self, nsprefix, name, attrs):
+        return self.keep(name, attrs or {})
+
+    def search_tag(self, markup_name=None, markup_attrs={}):
+        if isinstance(markup_name, str):
+            return self.keep(markup_name, dict(markup_attrs))
+        return super().search_tag(markup_name, markup_attrs)
+
+# 必要な要素のみを解析する
+def parse_html(html):
+    return bs(html, HTML_PARSER, parse_only=ResultStrainer())
+
+# 会社名を含む検索結果1件分の枠（説明タイトル・説明文を含む最も内側の要素）
+# 枠の中に他の会社名もある場合（1件分の枠が見つからない場合）はNone
+def find_result_container(name_tag):
+    for parent in name_tag.parents:
+        if parent.find(class_=RESULT_TITLE_CLASS) or parent.find(class_=RESULT_EXCERPT_CLASS):
+            return parent if len(parent.find_all(class_=RESULT_NAME_CLASS)) == 1 else None
+    return None
+
+# 要素の文字列（要素内の改行・空白は1つの空白にまとめる）
+def get_element_text(tag):
+    return " ".join(tag.get_text(" ").split()) if tag else ""
+
+# 検索結果ページから会社名・説明タイトル・説明文を取り出す
+# 説明タイトル・説明文は会社名と同じ検索結果の枠の中から探す（説明のない検索結果は空欄にする）
+# どの会社名にも枠が見つからない場合のみ、ページ内の出現順で対応付ける
+def parse_company_entries(soup):
+
+    company_names = soup.find_all(class_=RESULT_NAME_CLASS)
+    containers = [find_result_container(name) for name in company_names]
+
+    entries = []
+    if any(containers):
+        for name, container in zip(company_names, containers):
+            title = container.find(class_=RESULT_TITLE_CLASS) if container else None
+            excerpt = container.find(class_=RESULT_EXCERPT_CLASS) if container else None
+            entries.append(CompanyEntry(str(name.get_text()), get_element_text(title), get_element_text(excerpt)))
+        return entries
+
+    description_titles = soup.find_all(class_=RESULT_TITLE_CLASS)
+    descriptions = soup.find_all(class_=RESULT_EXCERPT_CLASS)
+    for i in range(len(company_names)):
+        text_com = company_names[i].get_text()
+        text_dest = get_element_text(description_titles[i]) if i < len(description_titles) else ""
+        text_des = get_element_text(descriptions[i]) if i < len(descriptions) else ""
+        entries.append(CompanyEntry(str(text_com), text_dest, text_des))
+
+    return entries
+
+# 検索結果ページから会社名を取り出す
+def parse_company_names(soup):
+    return [entry.name for entry in parse_company_entries(soup)]
+
+# 検索結果ページのページ送りリンクから次のページのURLを求める（最終ページならNone）
+# rel="next"、「次へ」などのリンク、現在のページ番号+1のリンクの順に探す
+def find_next_page_url(soup, url, page_no=1):
+    link = soup.find(["link", "a"], rel="next", href=True)
+    if link is None:
+        for a in soup.find_all("a", href=True):
+            if a.get_text(strip=True) in NEXT_LINK_TEXTS:
+                link = a
+                break
+    if link is None:
+        return find_page_links(soup, url).get(page_no + 1)
+    return urljoin(url, link["href"])
+
+# ページ送りのページ番号リンク {ページ番号: URL}
+def find_page_links(soup, url):
+    links = {}
+    for a in soup.find_all("a", href=True):
+        text = a.get_text(strip=True)
+        if text.isdigit():
+            links.setdefault(int(text), urljoin(url, a["href"]))
+    return links
+
+# 取得したページを解析して (検索結果のリスト, 次のページのURL, ページ番号リンク) を返す
+def parse_page(html, url, page_no=1):
+    soup = parse_html(html)
+    return parse_company_entries(soup), find_next_page_url(soup, url, page_no), find_page_links(soup, url)
+
+# 1ページ分を取得して解析する
+def capture_page(url, page_no=1, session=None, cache=None):
+    return parse_page(fetch_page(url, session, cache=cache), url, page_no)
+
+# 複数ページを並行して取得する
+# スレッドプールで取得・解析し、接続はホストごとにKeep-Aliveで使い回す
+# 同じホストへの同時接続数はper_hostまでに制限する
+class PageFetcher:
+    def __init__(self, workers=DEFAULT_WORKERS, per_host=DEFAULT_PER_HOST, cache=None):
+        self.per_host = per_host
+        self.cache = cache
+        self.session = create_session(workers)
+        self.executor = ThreadPoolExecutor(max_workers=workers)
+        self.host_limits = {}
+        self.lock = threading.Lock()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def host_limit(self, url):
+        host = urlsplit(url).netloc
+        with self.lock:
+            if host not in self.host_limits:
+                self.host_limits[host] = threading.BoundedSemaphore(self.per_host)
+            return self.host_limits[host]
+
+    # ホストごとの同時接続数を守ってページを取得・解析する
+    def capture(self, url, page_no=1):
+        with self.host_limit(url):
+            html = fetch_page(url, self.session, cache=self.cache)
+        return parse_page(html, url, page_no)
+
+    # 取得を開始し、capture_pageと同じ結果のFutureを返す
+    def submit(self, url, page_no=1):
+        return self.executor.submit(self.capture, url, page_no)
+
+    # 未着手の取得は取り消す
+    def close(self):
+        self.executor.shutdown(wait=True, cancel_futures=True)
+        self.session.close()
+
+# URLのリストを並行して取得し、会社名のリストをURLの順に返す
+# 取得できなかったページはエラーを記録して空のリストを返す
+def capture_pages(urls, workers=DEFAULT_WORKERS, per_host=DEFAULT_PER_HOST, cache=None):
+    with PageFetcher(workers, per_host, cache) as fetcher:
+        futures = [(url, fetcher.submit(url)) for url in urls]
+        for url, future in futures:
+            try:
+                yield [entry.name for entry in future.result()[0]]
+            except Exception as e:
+                logger.error(f"ページの取得失敗 ({url}): {str(e)}")
+                yield []
+
+def script_capture(url, cache=None):
+
+    #r = req.urlopen("https://fumasalse.com/search/?search_from_top=1&tab_btn=on&tab_btn_menu1=on&chu_code%5B%5D=28&chu_code%5B%5D=29&chu_code%5B%5D=31&tab_btn_data=on&listed=1&jugyoinsu%5B%5D=5&jugyoinsu%5B%5D=6")
+
+    entries, next_url, page_links = capture_page(url, cache=cache)
+    company_names = [entry.name for entry in entries]
+
+    #result = result.get_text()
+    #print("ここから")
+    #print(company_names[0])
+    #print(description_title)
+    #print(descriptions)
+    #print("ここまで")
+
+    return company_names #description_title, descriptions
+
+#script_capture("https://fumasalse.com/search/?search_from_top=1&tab_btn=on&tab_btn_menu1=on&chu_code%5B%5D=28&chu_code%5B%5D=29&chu_code%5B%5D=31&tab_btn_data=on&listed=1&jugyoinsu%5B%5D=5&jugyoinsu%5B%5D=6")
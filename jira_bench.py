@@ -0,0 +1,561 @@
+import argparse
+import json
+import logging
+import os
+import random
+import re
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from collections import Counter
+from datetime import datetime, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+from openpyxl import Workbook, load_workbook
+
+import jiraupdatemain as sync
+
+try:
+    import resource  # ピークRSSの取得（Unixのみ）
+except ImportError:
+    resource = None
+
+# 本番のJIRAに接続せずに同期処理の性能を測定するベンチマーク
+# プロセス内で動く疑似JIRA REST APIサーバに対して sync_excel_and_jira を実行し、
+# フェーズごとの実行時間・リクエスト数・ピークRSSを出力する
+
+DEFAULT_SIZES = [100, 1000, 10000]
+DEFAULT_PROJECT_KEY = "BENCH"
+SEARCH_MAX_RESULTS = 100  # JIRAと同様に1ページの件数を制限する
+JIRA_DATETIME_FORMAT = "%Y-%m-%dT%H:%M:%S.000+0000"
+
+# フェーズ間で経過したとみなす時間（前回同期時に更新したチケットが差分取得の対象から外れるようにする）
+PHASE_GAP = timedelta(hours=1)
+EDIT_RATIO = 0.1  # updateフェーズでExcel側を編集する行の割合
+JIRA_EDIT_RATIO = 0.05  # updateフェーズでJIRA側を編集するチケットの割合
+JIRA_ADD_RATIO = 0.01  # updateフェーズでJIRA側に追加するチケットの割合
+
+WORKBOOK_COLUMNS = sync.DEFAULT_COLUMNS + ["Sync", "Status"]
+
+# 疑似JIRAのチケットと受信したリクエストの記録
+class FakeJiraState:
+    def __init__(self, latency=0.0, rate_limit=None, fail_rate=0.0, seed=0):
+        self.latency = latency
+        self.rate_limit = rate_limit
+        self.fail_rate = fail_rate
+        self.random = random.Random(seed)
+        self.issues = {}
+        self.issue_count = 0
+        self.counts = Counter()  # "メソッド パス" ごとのリクエスト数
+        self.injected = Counter()  # 意図的に返したエラーのステータスごとの件数
+        self.lock = threading.Lock()
+        self.tokens = rate_limit or 0
+        self.updated_at = time.monotonic()
+
+    # チケットを追加してキーを返す
+    def add_issue(self, project_key, fields):
+        with self.lock:
+            self.issue_count += 1
+            key = f"{project_key}-{self.issue_count}"
+            assignee = fields.get("assignee")
+            self.issues[key] = {
+                "project": project_key,
+                "summary": fields.get("summary"),
+                "description": fields.get("description"),
+                "duedate": fields.get("duedate"),
+                "labels": list(fields.get("labels") or []),
+                "assignee": {"name": assignee["name"], "displayName": "Bench, User"} if assignee else None,
+                "status": {"name": "Open"},
+                "comments": [],
+                "updated": datetime.now(),
+            }
+            return key
+
+    # チケットのフィールドを更新する
+    def update_issue(self, key, fields):
+        with self.lock:
+            issue = self.issues[key]
+            for name, value in fields.items():
+                if name == "assignee":
+                    value = {"name": value["name"], "displayName": "Bench, User"} if value else None
+                issue[name] = value
+            issue["updated"] = datetime.now()
+
+    def add_comment(self, key, body):
+        with self.lock:
+            issue = self.issues[key]
+            issue["comments"].append({"body": body})
+            issue["updated"] = datetime.now()
+
+    # 全チケットの更新日時を過去にずらす（フェーズ間の時間経過を再現する）
+    def shift_clock(self, delta):
+        with self.lock:
+            for issue in self.issues.values():
+                issue["updated"] -= delta
+
+    # レート制限を超えていればTrue（トークンバケット）
+    def over_rate_limit(self):
+        if not self.rate_limit:
+            return False
+        with self.lock:
+            now = time.monotonic()
+            self.tokens = min(self.rate_limit, self.tokens + (now - self.updated_at) * self.rate_limit)
+            self.updated_at = now
+            if self.tokens >= 1:
+                self.tokens -= 1
+                return False
+            return True
+
+    def inject_failure(self):
+        if not self.fail_rate:
+            return False
+        with self.lock:
+            return self.random.random() < self.fail_rate
+
+    # 受信したリクエスト数をリセットして返す
+    def take_counts(self):
+        with self.lock:
+            counts, injected = self.counts, self.injected
+            self.counts, self.injected = Counter(), Counter()
+            return counts, injected
+
+    # JIRAのREST APIと同じ形式のチケット
+    def issue_json(self, key):
+        issue = self.issues[key]
+        comments = issue["comments"]
+        return {
+            "key": key,
+            "fields": {
+                "summary": issue["summary"],
+                "description": issue["description"],
+                "duedate": issue["duedate"],
+                "assignee": issue["assignee"],
+                "status": issue["status"],
+                "labels": issue["labels"],
+                "updated": issue["updated"].strftime(JIRA_DATETIME_FORMAT),
+                "comment": {"comments": comments, "total": len(comments), "maxResults": len(comments), "startAt": 0},
+            },
+        }
+
+    # 同期処理が使うJQL（project・labels・status NOT IN・updated >=・key in・ORDER BY updated DESC）のみ解釈する
+    def search(self, jql):
+        with self.lock:
+            keys = list(self.issues)
+            match = re.search(r"key in \(([^)]*)\)", jql)
+            if match:
+                keys = [key.strip() for key in match[1].split(",") if key.strip() in self.issues]
+            match = re.search(r"project = (\w+)", jql)
+            if match:
+                keys = [key for key in keys if self.issues[key]["project"] == match[1]]
+            match = re.search(r"labels = (\w+)", jql)
+            if match:
+                keys = [key for key in keys if match[1] in self.issues[key]["labels"]]
+            match = re.search(r"status NOT IN \(([^)]*)\)", jql)
+            if match:
+                excluded = {name.strip() for name in match[1].split(",")}
+                keys = [key for key in keys if self.issues[key]["status"]["name"] not in excluded]
+            match = re.search(r'updated >= "-([0-9]+)m"', jql)
+            if match:
+                since = datetime.now() - timedelta(minutes=int(match[1]))
+                keys = [key for key in keys if self.issues[key]["updated"] >= since]
+            if re.search(r"ORDER BY updated DESC", jql):
+                keys.sort(key=lambda key: self.issues[key]["updated"], reverse=True)
+            return keys
+
+# 疑似JIRAのリクエストハンドラ
+class FakeJiraHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # キープアライブ
+
+    def log_message(self, format, *args):
+        pass
+
+    @property
+    def state(self):
+        return self.server.state
+
+    def send_json(self, status, body=None, headers=None):
+        data = json.dumps(body).encode("utf-8") if body is not None else b""
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(data)
+
+    def read_json(self):
+        length = int(self.headers.get("Content-Length", 0))
+        return json.loads(self.rfile.read(length) or b"{}")
+
+    # 遅延・レート制限・障害注入を適用し、処理を続ける場合は (URL, クエリ, 本文) を返す
+    def begin(self, method):
+        url = urlparse(self.path)
+        with self.state.lock:
+            self.state.counts[f"{method} {re.sub(r'[A-Z][A-Z0-9]*-[0-9]+', '{key}', url.path)}"] += 1
+        if method in ("POST", "PUT"):
+            body = self.read_json()  # エラーを返す場合も本文は読み捨てる
+        else:
+            body = None
+        if self.state.latency:
+            time.sleep(self.state.latency)
+        if self.state.over_rate_limit():
+            with self.state.lock:
+                self.state.injected[429] += 1
+            self.send_json(429, {"errorMessages": ["Rate limit exceeded"]}, {"Retry-After": "1"})
+            return None
+        if self.state.inject_failure():
+            with self.state.lock:
+                self.state.injected[503] += 1
+            self.send_json(503, {"errorMessages": ["Service unavailable"]})
+            return None
+        return url, parse_qs(url.query), body
+
+    def do_GET(self):
+        request = self.begin("GET")
+        if request is None:
+            return
+        url, query, body = request
+        match = re.fullmatch(r"/rest/api/2/issue/([^/]+)/comment", url.path)
+        if match and match[1] in self.state.issues:
+            return self.send_json(200, {"comments": self.state.issues[match[1]]["comments"]})
+        match = re.fullmatch(r"/rest/api/2/issue/([^/]+)", url.path)
+        if match and match[1] in self.state.issues:
+            return self.send_json(200, self.state.issue_json(match[1]))
+        if url.path == "/rest/api/2/search":
+            keys = self.state.search(query.get("jql", [""])[0])
+            start_at = int(query.get("startAt", ["0"])[0])
+            max_results = min(int(query.get("maxResults", ["50"])[0]), SEARCH_MAX_RESULTS)
+            page = keys[start_at:start_at + max_results]
+            return self.send_json(200, {"startAt": start_at, "maxResults": max_results, "total": len(keys),
+                                        "issues": [self.state.issue_json(key) for key in page]})
+        if url.path == "/rest/api/2/serverInfo":
+            return self.send_json(200, {"serverTime": datetime.now().astimezone().strftime(sync.JIRA_DATETIME_FORMAT)})
+        if url.path == "/rest/api/2/user/search":
+            username = query.get("username", [""])[0]
+            return self.send_json(200, [{"name": username, "displayName": "Bench, User"}] if username else [])
+        self.send_json(404, {"errorMessages": ["Not found"]})
+
+    def do_POST(self):
+        request = self.begin("POST")
+        if request is None:
+            return
+        url, query, body = request
+        if url.path == "/rest/api/2/issue":
+            fields = body["fields"]
+            return self.send_json(201, {"key": self.state.add_issue(fields["project"]["key"], fields)})
+        if url.path == "/rest/api/2/issue/bulk":
+            issues = []
+            for update in body.get("issueUpdates", []):
+                fields = update["fields"]
+                issues.append({"key": self.state.add_issue(fields["project"]["key"], fields)})
+            return self.send_json(201, {"issues": issues, "errors": []})
+        match = re.fullmatch(r"/rest/api/2/issue/([^/]+)/comment", url.path)
+        if match and match[1] in self.state.issues:
+            self.state.add_comment(match[1], body["body"])
+            return self.send_json(201, {"body": body["body"]})
+        self.send_json(404, {"errorMessages": ["Not found"]})
+
+    def do_PUT(self):
+        request = self.begin("PUT")
+        if request is None:
+            return
+        url, query, body = request
+        match = re.fullmatch(r"/rest/api/2/issue/([^/]+)", url.path)
+        if match and match[1] in self.state.issues:
+            self.state.update_issue(match[1], body.get("fields", {}))
+            return self.send_json(204)
+        self.send_json(404, {"errorMessages": ["Not found"]})
+
+# プロセス内で動く疑似JIRAサーバ（空いているポートで待ち受ける）
+class FakeJiraServer:
+    def __init__(self, state):
+        self.state = state
+        self.httpd = ThreadingHTTPServer(("127.0.0.1", 0), FakeJiraHandler)
+        self.httpd.daemon_threads = True
+        self.httpd.state = state
+        self.thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+
+    @property
+    def url(self):
+        host, port = self.httpd.server_address
+        return f"http://{host}:{port}"
+
+    def start(self):
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+# ベンチマーク用のワークブックを作成する（全行が未作成のチケット）
+def make_synthetic_workbook(path, rows, seed=0):
+    rng = random.Random(seed)
+    wb = Workbook()
+    ws = wb.active
+    ws.title = sync.MAIN_SHEET_NAME
+    ws.append(WORKBOOK_COLUMNS)
+    for no in range(1, rows + 1):
+        due_date = (datetime(2026, 1, 1) + timedelta(days=rng.randrange(365))).strftime("%Y-%m-%d")
+        ws.append([
+            no,
+            None,
+            f"Benchmark question {no}",
+            "Subaru",
+            f"Description of question {no}\n" + "detail " * rng.randrange(1, 20),
+            due_date if rng.random() < 0.5 else None,
+            f"Comment {no}" if rng.random() < 0.3 else None,
+            "〇",
+            None,
+        ])
+    wb.save(path)
+
+# Excel側の一部の行を編集して再同期の対象にする
+def edit_workbook_rows(path, ratio, seed=0):
+    rng = random.Random(seed)
+    wb = load_workbook(path)
+    ws = wb.worksheets[0]
+    columns = {cell.value: cell.column for cell in ws[1]}
+    rows = list(range(2, ws.max_row + 1))
+    edited = rng.sample(rows, max(1, int(len(rows) * ratio))) if rows else []
+    for row in edited:
+        ws.cell(row=row, column=columns["Summary"], value=f"Edited question {row - 1}")
+        ws.cell(row=row, column=columns["Assignee"], value="Subaru")
+        ws.cell(row=row, column=columns["Sync"], value="〇")
+    wb.save(path)
+    return len(edited)
+
+# JIRA側でチケットの編集・追加を行う（インポートの対象になる）
+def edit_jira_issues(state, project_key, edit_ratio, add_ratio, seed=0):
+    rng = random.Random(seed)
+    keys = list(state.issues)
+    edited = rng.sample(keys, max(1, int(len(keys) * edit_ratio))) if keys else []
+    for key in edited:
+        state.update_issue(key, {"description": f"Answered in JIRA ({key})"})
+    added = max(1, int(len(keys) * add_ratio))
+    for number in range(added):
+        state.add_issue(project_key, {
+            "summary": f"[{project_key}] Question from JIRA {number}",
+            "description": "Created in JIRA",
+            "labels": ["Customer_QA"],
+            "assignee": {"name": "bench"},
+        })
+    return len(edited), added
+
+# フェーズ間の時間経過を再現する（JIRAの更新日時と同期状態のウォーターマークを同じだけ戻す）
+def advance_clock(state, excel_path, delta):
+    state.shift_clock(delta)
+    sync_state = sync.SyncState(sync.get_sync_state_path(excel_path))
+    try:
+        watermark = sync_state.get_watermark()
+        if watermark:
+            sync_state.set_watermark(watermark - delta)
+            sync_state.commit()
+    finally:
+        sync_state.close()
+
+# プロセスのピークRSS（MB）
+def peak_rss_mb():
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linuxはキロバイト、macOSはバイト単位
+    return round(peak / (1024 * 1024 if os.uname().sysname == "Darwin" else 1024), 1)
+
+# 1フェーズ分の同期を実行して計測する
+def run_phase(name, server, excel_path, project_key, workers, rate_limit):
+    server.state.take_counts()
+    metrics = sync.SyncMetrics()
+    client = sync.JiraClient(server.url, {"Content-Type": "application/json"},
+                             pool_size=max(sync.DEFAULT_POOL_SIZE, workers),
+                             scheduler=sync.RequestScheduler(rate_limit), metrics=metrics)
+    started = time.perf_counter()
+    try:
+        success = sync.sync_excel_and_jira(excel_path, project_key, client=client, workers=workers,
+                                           metrics=metrics)
+    finally:
+        client.close()
+    wall_time = time.perf_counter() - started
+    counts, injected = server.state.take_counts()
+    report = metrics.report()
+    return {
+        "phase": name,
+        "success": success,
+        "wall_time": round(wall_time, 3),
+        "requests": sum(counts.values()),
+        "requests_by_endpoint": dict(sorted(counts.items())),
+        "injected_errors": {str(status): count for status, count in sorted(injected.items())},
+        "peak_rss_mb": peak_rss_mb(),
+        "sync_phases": report["phases"],
+        "http": report["http"],
+    }
+
+# 1つのワークブックサイズについて create → update → noop の3フェーズを計測する
+# - create: 全行を新規作成する初回同期
+# - update: Excel側の編集の送信と、JIRA側で編集・追加されたチケットのインポート
+# - noop: 変更がない状態での再同期
+def run_benchmark(rows, workdir, project_key=DEFAULT_PROJECT_KEY, workers=1, rate_limit=None,
+                  latency=0.0, server_rate_limit=None, fail_rate=0.0, seed=0):
+    state = FakeJiraState(latency, server_rate_limit, fail_rate, seed)
+    server = FakeJiraServer(state).start()
+    excel_path = os.path.join(workdir, f"bench_{rows}.xlsx")
+    results = []
+    try:
+        make_synthetic_workbook(excel_path, rows, seed)
+        results.append(run_phase("create", server, excel_path, project_key, workers, rate_limit))
+
+        advance_clock(state, excel_path, PHASE_GAP)
+        edit_workbook_rows(excel_path, EDIT_RATIO, seed)
+        edit_jira_issues(state, project_key, JIRA_EDIT_RATIO, JIRA_ADD_RATIO, seed)
+        results.append(run_phase("update", server, excel_path, project_key, workers, rate_limit))
+
+        advance_clock(state, excel_path, PHASE_GAP)
+        results.append(run_phase("noop", server, excel_path, project_key, workers, rate_limit))
+    finally:
+        server.stop()
+    for result in results:
+        result["rows"] = rows
+    return results
+
+# 結果を表形式で出力
+def print_results(results):
+    print(f"{'rows':>6} {'phase':<7} {'ok':<3} {'wall[s]':>8} {'requests':>9} {'peakRSS[MB]':>12}  内訳")
+    for result in results:
+        breakdown = ", ".join(f"{endpoint}={count}" for endpoint, count in result["requests_by_endpoint"].items())
+        if result["injected_errors"]:
+            breakdown += f" (注入エラー: {result['injected_errors']})"
+        print(f"{result['rows']:>6} {result['phase']:<7} {'○' if result['success'] else '×':<3} "
+              f"{result['wall_time']:>8.2f} {result['requests']:>9} {str(result['peak_rss_mb']):>12}  {breakdown}")
+        print(" " * 18 + "処理時間: " + ", ".join(f"{name}={seconds:.2f}s" for name, seconds in result["sync_phases"].items()))
+
+# 起動時間の計測（--startup）
+SYNC_SCRIPT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "jiraupdatemain.py")
+STARTUP_REPEAT = 5  # 起動時間の計測回数（中央値を使う）
+DEFAULT_STARTUP_BUDGET = 1.0  # 起動時間の上限（秒）
+HEAVY_MODULES = ["pandas", "numpy", "openpyxl"]  # 変更のない実行で読み込まれてはいけないモジュール
+
+# 疑似JIRAに接続するための認証情報モジュールを作成する（子プロセスのjira_authとして読み込ませる）
+def write_fake_auth(workdir, server):
+    with open(os.path.join(workdir, "jira_auth.py"), "w", encoding="utf-8") as f:
+        f.write("def get_auth_info():\n")
+        f.write(f"    return '', {server.url!r}, {{'Content-Type': 'application/json'}}\n")
+
+# 同期スクリプトを子プロセスで実行し、(所要時間, 読み込まれた重いモジュール) を返す
+def run_sync_script(args, workdir):
+    env = dict(os.environ, PYTHONPATH=workdir + os.pathsep + os.environ.get("PYTHONPATH", ""))
+    started = time.perf_counter()
+    proc = subprocess.run([sys.executable, "-X", "importtime", SYNC_SCRIPT] + args, cwd=workdir, env=env,
+                          stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True, encoding="utf-8")
+    elapsed = time.perf_counter() - started
+    imported = sorted({name for name in HEAVY_MODULES
+                       if re.search(rf"\| +{name}$", proc.stderr, re.MULTILINE)})
+    if proc.returncode not in (0, 2):  # 2は引数エラー（--helpなしの起動時間の計測用）
+        raise RuntimeError(f"同期スクリプトが失敗しました: {' '.join(args)}")
+    return elapsed, imported
+
+# CLIの起動時間を計測する
+# - help: --helpの表示
+# - noop: 前回の同期からExcel・JIRAとも変更がない実行（pandas・openpyxlを読み込まないこと）
+def run_startup_benchmark(workdir, project_key=DEFAULT_PROJECT_KEY, rows=100):
+    results = []
+    timings = [run_sync_script(["--help"], workdir) for _ in range(STARTUP_REPEAT)]
+    results.append({"case": "help", "seconds": round(sorted(t for t, _ in timings)[len(timings) // 2], 3),
+                    "heavy_imports": timings[0][1]})
+
+    state = FakeJiraState()
+    server = FakeJiraServer(state).start()
+    try:
+        write_fake_auth(workdir, server)
+        excel_path = os.path.join(workdir, f"startup_{rows}.xlsx")
+        make_synthetic_workbook(excel_path, rows)
+        # 1回目で作成、2回目は1回目の自分の更新を取り込む通常の同期、3回目以降が変更なし
+        for _ in range(2):
+            run_sync_script([excel_path, project_key], workdir)
+        state.take_counts()
+        timings = [run_sync_script([excel_path, project_key], workdir) for _ in range(STARTUP_REPEAT)]
+        counts, _ = state.take_counts()
+        results.append({"case": "noop", "seconds": round(sorted(t for t, _ in timings)[len(timings) // 2], 3),
+                        "heavy_imports": sorted({name for _, imported in timings for name in imported}),
+                        "requests_per_run": sum(counts.values()) / len(timings)})
+    finally:
+        server.stop()
+    return results
+
+# 起動時間の計測結果を出力し、上限を超えた場合・変更のない実行で重いモジュールを読み込んだ場合はFalse
+def check_startup_results(results, budget):
+    ok = True
+    for result in results:
+        problems = []
+        if result["seconds"] > budget:
+            problems.append(f"上限 {budget}秒 を超過")
+        if result["heavy_imports"]:
+            problems.append(f"読み込まれたモジュール: {', '.join(result['heavy_imports'])}")
+        ok = ok and not problems
+        extra = f"、リクエスト {result['requests_per_run']:g}件/回" if "requests_per_run" in result else ""
+        print(f"{result['case']:<5} {result['seconds']:.3f}秒{extra}  {'OK' if not problems else 'NG: ' + '、'.join(problems)}")
+    return ok
+
+# メイン関数
+def main():
+    parser = argparse.ArgumentParser(description="疑似JIRAサーバを使った同期処理のベンチマーク")
+    parser.add_argument("--sizes", type=int, nargs="+", default=DEFAULT_SIZES,
+                        help="ワークブックの行数（デフォルト: 100 1000 10000）")
+    parser.add_argument("--project", default=DEFAULT_PROJECT_KEY, help="プロジェクトキー")
+    parser.add_argument("--workers", type=int, default=1, help="同期処理の並列数")
+    parser.add_argument("--rate-limit", type=float, default=None,
+                        help="クライアント側の毎秒リクエスト数の上限")
+    parser.add_argument("--latency", type=float, default=0.0,
+                        help="疑似JIRAの1リクエストあたりの応答遅延（秒）")
+    parser.add_argument("--server-rate-limit", type=float, default=None,
+                        help="疑似JIRAの毎秒リクエスト数の上限（超えると429を返す）")
+    parser.add_argument("--fail-rate", type=float, default=0.0,
+                        help="疑似JIRAが503を返す割合（0〜1）")
+    parser.add_argument("--seed", type=int, default=0, help="乱数シード")
+    parser.add_argument("--json", metavar="PATH", help="結果をJSONで保存するパス")
+    parser.add_argument("--workdir", help="ワークブックの作成先（省略時は一時ディレクトリを作成して削除する）")
+    parser.add_argument("--verbose", action="store_true", help="同期処理のINFOログも出力する")
+    parser.add_argument("--startup", action="store_true",
+                        help="同期処理の代わりにCLIの起動時間（--help・変更のない実行）を計測する")
+    parser.add_argument("--startup-budget", type=float, default=DEFAULT_STARTUP_BUDGET,
+                        help=f"--startupで許容する起動時間（秒、デフォルト: {DEFAULT_STARTUP_BUDGET:g}）")
+    args = parser.parse_args()
+
+    sync.setup_logging(log_file=None)
+    if not args.verbose:
+        logging.getLogger(sync.__name__).setLevel(logging.WARNING)
+
+    workdir = args.workdir or tempfile.mkdtemp(prefix="jira_bench_")
+    os.makedirs(workdir, exist_ok=True)
+    if args.startup:
+        try:
+            results = run_startup_benchmark(workdir, args.project)
+        finally:
+            if not args.workdir:
+                shutil.rmtree(workdir, ignore_errors=True)
+        ok = check_startup_results(results, args.startup_budget)
+        if args.json:
+            with open(args.json, "w", encoding="utf-8") as f:
+                json.dump(results, f, ensure_ascii=False, indent=2)
+        sys.exit(0 if ok else 1)
+
+    results = []
+    try:
+        # ピークRSSはプロセス全体の最大値のため、小さいサイズから順に実行する
+        for rows in sorted(args.sizes):
+            results.extend(run_benchmark(rows, workdir, args.project, args.workers, args.rate_limit,
+                                         args.latency, args.server_rate_limit, args.fail_rate, args.seed))
+    finally:
+        if not args.workdir:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+    print_results(results)
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(results, f, ensure_ascii=False, indent=2)
+
+if __name__ == "__main__":
+    main()
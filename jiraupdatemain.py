@@ -1,24 +1,333 @@
-import pandas as pd
-import requests
 import sys
+import argparse
+import hashlib
+import importlib
+import json
+import math
+import sqlite3
 import logging
 import os
-import openpyxl
-from jira_auth import get_auth_info
-from openpyxl import load_workbook, styles
-from shutil import copy
-
-# ロギング設定
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(levelname)s - %(message)s',
-    handlers=[
-        logging.StreamHandler(),
-        logging.FileHandler('jira_sync.log', encoding='utf-8')
-    ]
-)
+import random
+import threading
+import time
+import tempfile
+import shutil
+import copy
+import csv
+import re
+from collections import namedtuple
+from contextlib import contextmanager
+from datetime import datetime, timedelta, timezone
+from email.utils import parsedate_to_datetime
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+
+# 初回の属性アクセス時にモジュールを読み込む代理オブジェクト
+# pandas・openpyxl・requestsは読み込みに時間がかかるため、実際に使う処理でのみ読み込む
+# （--helpや引数エラー、変更のない実行ではpandas・openpyxlを読み込まない）
+class LazyModule:
+    def __init__(self, name):
+        self.name = name
+        self.module = None
+
+    def __getattr__(self, attr):
+        if self.module is None:
+            self.module = importlib.import_module(self.name)
+        return getattr(self.module, attr)
+
+np = LazyModule("numpy")
+pd = LazyModule("pandas")
+requests = LazyModule("requests")
+requests_adapters = LazyModule("requests.adapters")
+urllib3_exceptions = LazyModule("urllib3.exceptions")
+openpyxl = LazyModule("openpyxl")
+styles = LazyModule("openpyxl.styles")
+formatting_rule = LazyModule("openpyxl.formatting.rule")
+
+# ログファイル
+LOG_FILE = "jira_sync.log"
+
 logger = logging.getLogger(__name__)
 
+# ロギング設定（コマンドとして実行した場合のみ。log_file=Noneでファイルには出力しない）
+def setup_logging(log_file=LOG_FILE):
+    handlers = [logging.StreamHandler()]
+    if log_file:
+        handlers.append(logging.FileHandler(log_file, encoding='utf-8'))
+    logging.basicConfig(
+        level=logging.INFO,
+        format='%(asctime)s - %(levelname)s - %(message)s',
+        handlers=handlers
+    )
+
+# HTTP接続設定
+DEFAULT_POOL_SIZE = 10  # 接続プールの最大接続数
+DEFAULT_TIMEOUT = (5, 60)  # (接続, 読み込み) タイムアウト秒
+
+# リトライ設定
+RETRY_STATUSES = {429, 500, 502, 503, 504}  # リトライ対象のステータス
+IDEMPOTENT_METHODS = {"GET", "HEAD", "OPTIONS", "PUT", "DELETE"}  # 5xx・通信エラーでリトライしてよいメソッド
+DEFAULT_MAX_RETRIES = 5
+DEFAULT_BACKOFF_BASE = 0.5  # 指数バックオフの初期待ち時間（秒）
+DEFAULT_BACKOFF_MAX = 30  # バックオフの上限（秒）
+
+# パス中のチケットキー（/issue/ABC-123）
+ISSUE_KEY_PATTERN = re.compile(r"/[A-Z][A-Z0-9_]*-[0-9]+(?=/|$)")
+
+# 全ワーカー共通のリクエストスケジューラ
+# - トークンバケットで毎秒のリクエスト数を制限する（rate_limit=Noneで無制限）
+# - 429はRetry-Afterに従って全メソッドをリトライする（サーバ側で処理されていないため）
+# - 5xx・通信エラーは冪等なメソッドのみ、ジッター付き指数バックオフでリトライする
+# - max_in_flightで同時に送信中のリクエスト数を制限する（複数ワークブックの一括同期で共有する）
+class RequestScheduler:
+    def __init__(self, rate_limit=None, burst=None, max_retries=DEFAULT_MAX_RETRIES,
+                 backoff_base=DEFAULT_BACKOFF_BASE, backoff_max=DEFAULT_BACKOFF_MAX, max_in_flight=None):
+        self.rate_limit = rate_limit
+        self.in_flight = threading.BoundedSemaphore(max_in_flight) if max_in_flight else None
+        self.capacity = burst or max(1, int(rate_limit or 1))
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.tokens = self.capacity
+        self.updated_at = time.monotonic()
+        self.lock = threading.Lock()
+
+    # トークンを1つ取得する（足りなければ補充されるまで待つ）
+    def acquire(self):
+        if not self.rate_limit:
+            return
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated_at) * self.rate_limit)
+                self.updated_at = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = (1 - self.tokens) / self.rate_limit
+            time.sleep(wait)
+
+    # 429を受けた場合、待ち時間の間は他のワーカーも送信しないようにバケットを空にする
+    def pause(self, seconds):
+        if not self.rate_limit:
+            return
+        with self.lock:
+            self.tokens = min(self.tokens, 0) - seconds * self.rate_limit
+
+    # 同時送信数の上限内でリクエストを1回送信する
+    def dispatch(self, send):
+        if self.in_flight is None:
+            return send()
+        with self.in_flight:
+            return send()
+
+    # ジッター付き指数バックオフの待ち時間
+    def backoff(self, attempt):
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * (2 ** attempt)))
+
+    # send()でリクエストを実行し、必要に応じて待機・リトライする
+    def execute(self, method, send):
+        idempotent = method.upper() in IDEMPOTENT_METHODS
+        attempt = 0
+        while True:
+            self.acquire()
+            try:
+                res = self.dispatch(send)
+            except (requests.ConnectionError, requests.Timeout) as e:
+                if not idempotent or attempt >= self.max_retries:
+                    raise
+                wait = self.backoff(attempt)
+                logger.warning(f"通信エラーのためリトライします ({wait:.1f}秒後): {str(e)}")
+            else:
+                if res.status_code not in RETRY_STATUSES or attempt >= self.max_retries:
+                    return res
+                if res.status_code != 429 and not idempotent:
+                    return res
+                retry_after = parse_retry_after(res.headers.get("Retry-After"))
+                wait = retry_after if retry_after is not None else self.backoff(attempt)
+                if res.status_code == 429:
+                    self.pause(wait)
+                logger.warning(f"HTTP {res.status_code} のためリトライします ({wait:.1f}秒後): {method} {res.url}")
+                res.close()
+            time.sleep(wait)
+            attempt += 1
+
+# Retry-Afterヘッダー（秒数またはHTTP日付）を待ち秒数に変換
+def parse_retry_after(value):
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        retry_at = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    return max(0.0, (retry_at - datetime.now(retry_at.tzinfo)).total_seconds())
+
+# 計測レポートで出力するレイテンシのパーセンタイル
+METRICS_PERCENTILES = [50, 90, 99]
+
+# 値のパーセンタイル（最近傍順位法）
+def percentile(sorted_values, p):
+    if not sorted_values:
+        return None
+    rank = max(1, -(-len(sorted_values) * p // 100))
+    return sorted_values[int(rank) - 1]
+
+# 同期処理の計測値（フェーズごとの所要時間と、エンドポイント・ステータスごとのHTTPリクエスト）
+# HTTPリクエストは並列実行中のワーカーからも記録されるためロックで保護する
+class SyncMetrics:
+    def __init__(self):
+        self.started_at = datetime.now()
+        self.info = {}  # レポートに含める実行内容（ファイル・プロジェクト・処理件数など）
+        self.phases = {}  # フェーズ名 → 所要時間（秒）。同じフェーズに複数回入った場合は合算する
+        self.http_latencies = {}  # "メソッド エンドポイント" → 応答時間（秒）のリスト
+        self.http_statuses = {}  # "メソッド エンドポイント" → {ステータス: 件数}
+        self.lock = threading.Lock()
+
+    # with metrics.phase("import"): のように使い、ブロックの所要時間を記録する
+    @contextmanager
+    def phase(self, name):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.phases[name] = self.phases.get(name, 0.0) + time.perf_counter() - started
+
+    # HTTPリクエスト1回分（リトライは別のリクエストとして数える）を記録する
+    # チケットキーを含むパスは {key} に置き換えてエンドポイント単位で集計する
+    def record_request(self, method, path, status, seconds):
+        endpoint = f"{method} {ISSUE_KEY_PATTERN.sub('/{key}', path)}"
+        with self.lock:
+            self.http_latencies.setdefault(endpoint, []).append(seconds)
+            statuses = self.http_statuses.setdefault(endpoint, {})
+            statuses[status] = statuses.get(status, 0) + 1
+
+    # 計測結果をdictにまとめる
+    def report(self):
+        with self.lock:
+            http = {}
+            for endpoint, latencies in sorted(self.http_latencies.items()):
+                latencies = sorted(latencies)
+                entry = {
+                    "count": len(latencies),
+                    "statuses": {str(status): count for status, count in sorted(self.http_statuses[endpoint].items(), key=lambda item: str(item[0]))},
+                    "total_seconds": round(sum(latencies), 4),
+                    "max_seconds": round(latencies[-1], 4),
+                }
+                for p in METRICS_PERCENTILES:
+                    entry[f"p{p}_seconds"] = round(percentile(latencies, p), 4)
+                http[endpoint] = entry
+        return dict(self.info,
+                    started_at=self.started_at.isoformat(),
+                    total_seconds=round((datetime.now() - self.started_at).total_seconds(), 4),
+                    phases={name: round(seconds, 4) for name, seconds in self.phases.items()},
+                    http_requests=sum(entry["count"] for entry in http.values()),
+                    http_seconds=round(sum(entry["total_seconds"] for entry in http.values()), 4),
+                    http=http)
+
+    # フェーズごとの所要時間とHTTPリクエスト数をログ出力
+    def log_summary(self):
+        report = self.report()
+        logger.info("処理時間: " + ", ".join(f"{name} {seconds:.2f}秒" for name, seconds in report["phases"].items()))
+        logger.info(f"HTTPリクエスト: {report['http_requests']}件 (合計 {report['http_seconds']:.2f}秒)")
+        for endpoint, entry in report["http"].items():
+            logger.info(f"  {endpoint}: {entry['count']}件 p50 {entry['p50_seconds']:.3f}秒 p99 {entry['p99_seconds']:.3f}秒")
+
+    # 計測結果をファイルに保存する（拡張子が.csvならCSV、それ以外はJSON）
+    def write(self, path):
+        report = self.report()
+        if os.path.splitext(path)[1].lower() == ".csv":
+            with open(path, "w", encoding="utf-8", newline="") as f:
+                writer = csv.writer(f)
+                columns = ["count", "total_seconds"] + [f"p{p}_seconds" for p in METRICS_PERCENTILES] + ["max_seconds", "statuses"]
+                writer.writerow(["kind", "name"] + columns)
+                for name, seconds in report["phases"].items():
+                    writer.writerow(["phase", name, "", seconds] + [""] * (len(columns) - 2))
+                for endpoint, entry in report["http"].items():
+                    statuses = " ".join(f"{status}:{count}" for status, count in entry["statuses"].items())
+                    writer.writerow(["http", endpoint] + [entry[column] for column in columns[:-1]] + [statuses])
+        else:
+            with open(path, "w", encoding="utf-8") as f:
+                json.dump(report, f, ensure_ascii=False, indent=2)
+        return report
+
+# 同期処理の計測結果の保存先（Excelファイルと同じ場所）
+def get_metrics_path(excel_path):
+    base, _ = os.path.splitext(excel_path)
+    return f"{base}_sync_metrics.json"
+
+# JIRA REST APIクライアント
+# requests.Sessionを共有し、TCP/TLS接続をキープアライブで再利用する
+# リクエストはすべてRequestSchedulerを通して送信する
+# metricsを設定するとリクエストごとのエンドポイント・ステータス・応答時間を記録する
+class JiraClient:
+    def __init__(self, jira_url, headers, pool_size=DEFAULT_POOL_SIZE, timeout=DEFAULT_TIMEOUT,
+                 scheduler=None, metrics=None):
+        self.jira_url = jira_url.rstrip('/')
+        self.timeout = timeout
+        self.scheduler = scheduler or RequestScheduler()
+        self.metrics = metrics
+        self.session = requests.Session()
+        self.session.headers.update(headers)
+        self.session.headers["Connection"] = "keep-alive"
+        adapter = requests_adapters.HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+        # with_metrics()で作成したクライアントとも共有する
+        self.users = UserDirectory(defaults={CREATE_ASSIGNEE: CREATE_ASSIGNEE_DISPLAY_NAME})
+
+    # get_auth_info()の認証情報からクライアントを作成
+    # （認証情報を使わないベンチマークなどからも読み込めるよう、ここでインポートする）
+    @classmethod
+    def from_auth_info(cls, **kwargs):
+        from jira_auth import get_auth_info
+        token, jira_url, headers = get_auth_info()
+        return cls(jira_url, headers, **kwargs)
+
+    # JIRAのパス（/rest/api/2/...）に対してリクエストを送信
+    def request(self, method, path, **kwargs):
+        kwargs.setdefault("timeout", self.timeout)
+        url = f"{self.jira_url}{path}"
+        return self.scheduler.execute(method, lambda: self.send(method, url, path, **kwargs))
+
+    # 1回分のリクエストを送信し、計測中であれば記録する（リトライは1回ずつ記録される）
+    def send(self, method, url, path, **kwargs):
+        if self.metrics is None:
+            return self.session.request(method, url, **kwargs)
+        started = time.perf_counter()
+        status = "error"
+        try:
+            res = self.session.request(method, url, **kwargs)
+            status = res.status_code
+            return res
+        finally:
+            self.metrics.record_request(method, path, status, time.perf_counter() - started)
+
+    def get(self, path, **kwargs):
+        return self.request("GET", path, **kwargs)
+
+    def post(self, path, **kwargs):
+        return self.request("POST", path, **kwargs)
+
+    def put(self, path, **kwargs):
+        return self.request("PUT", path, **kwargs)
+
+    # 接続（セッション）とスケジューラを共有し、計測先のみ異なるクライアント
+    def with_metrics(self, metrics):
+        client = copy.copy(self)
+        client.metrics = metrics
+        return client
+
+    # ブラウザで開くチケットURL
+    def browse_url(self, key):
+        return f"{self.jira_url}/browse/{key}"
+
+    def close(self):
+        self.session.close()
+
 # URLからチケットキーを抽出
 # 例: https://jira.example.com/browse/ABC-123 → ABC-123
 def extract_key(url):
@@ -33,27 +342,125 @@ def ensure_summary_header(summary, project_label):
 
 # JIRAのコメントAPIからチケットの最後のコメントを取得
 # Excelへの書き戻し用に使用
-def get_last_comment(jira_url, key, headers):
+def get_last_comment(client, key, log=logger):
     try:
-        comments_url = f"{jira_url}/rest/api/2/issue/{key}/comment"
-        resp = requests.get(comments_url, headers=headers)
+        resp = client.get(f"/rest/api/2/issue/{key}/comment")
         resp.raise_for_status()
         comments = resp.json().get("comments", [])
         return comments[-1]["body"] if comments else ""
     except Exception as e:
-        logger.error(f"コメント取得失敗 ({key}): {str(e)}")
+        log.error(f"コメント取得失敗 ({key}): {str(e)}")
         return ""
 
+# 検索結果に埋め込まれたコメント一覧から最後のコメントを取得
+# 一覧が切り詰められている（total件より少ない）場合のみコメントAPIへフォールバックする
+def get_last_comment_from_fields(client, key, fields, log=logger):
+    comment_info = fields.get("comment")
+    if not comment_info:
+        return get_last_comment(client, key, log)
+    comments = comment_info.get("comments", [])
+    if len(comments) < comment_info.get("total", len(comments)):
+        return get_last_comment(client, key, log)
+    return comments[-1]["body"] if comments else ""
+
 # JIRAのチケットからAssigneeの表示名を取得してExcelへ転記する
 # "山田 太郎 (uid12345)"の形式で返す
-def get_jira_assignee_name(fields):
+# usersを指定した場合は、検索結果に含まれる担当者の表示名をユーザー情報のキャッシュに登録する
+def get_jira_assignee_name(fields, users=None):
     assignee_info = fields.get("assignee")
     if assignee_info and assignee_info.get("displayName"):
-        return assignee_info["displayName"] + f" ({assignee_info.get('name', '')})"
+        if users is not None:
+            users.add(assignee_info)
+        return format_user_name(assignee_info["displayName"], assignee_info.get('name', ''))
     return ""
 
-# JIRAに新規チケットを作成する
-def create_jira_ticket(jira_url, headers, project_key, row, idx, df):
+# Excelに転記するユーザー名（"表示名 (アカウント名)"）
+def format_user_name(display_name, name):
+    return display_name + f" ({name})"
+
+# ユーザー情報（アカウント名 → 表示名）のキャッシュの有効期間（秒）
+USER_CACHE_TTL = 7 * 24 * 60 * 60
+
+# ユーザー情報のキャッシュ
+# 検索結果の担当者とユーザー検索APIの結果から登録し、同期状態ファイルに保存して次回以降も使う
+# 登録からUSER_CACHE_TTL秒を過ぎたものは使わない（表示名の変更に追従するため）
+# defaultsは取得できなかった場合に使う表示名（アカウント名 → 表示名）。キャッシュには登録しない
+class UserDirectory:
+    def __init__(self, ttl=USER_CACHE_TTL, defaults=None):
+        self.ttl = ttl
+        self.defaults = defaults or {}
+        self.users = {}  # アカウント名 → (表示名, 登録時刻)
+        self.dirty = set()  # 同期状態ファイルに未保存のアカウント名
+        self.lock = threading.Lock()
+
+    # JIRAのユーザー情報（{"name": ..., "displayName": ...}）を登録する
+    def add(self, user, fetched_at=None):
+        name = user.get("name")
+        display_name = user.get("displayName")
+        if not name or not display_name:
+            return
+        with self.lock:
+            current = self.users.get(name)
+            if fetched_at is None:
+                fetched_at = time.time()
+                # 同じ内容で最近登録済みなら保存し直さない
+                if current and current[0] == display_name and fetched_at - current[1] < self.ttl / 2:
+                    return
+                self.dirty.add(name)
+            elif current and current[1] >= fetched_at:
+                return  # 読み込んだものより新しい情報を登録済み
+            self.users[name] = (display_name, fetched_at)
+
+    # 有効期間内の表示名。なければNone
+    def get(self, name):
+        with self.lock:
+            entry = self.users.get(name)
+        if entry is None or time.time() - entry[1] > self.ttl:
+            return None
+        return entry[0]
+
+    # Excelに転記する名前。表示名が不明な場合は既定の表示名、それもなければアカウント名のみ
+    def format_name(self, name):
+        display_name = self.get(name) or self.defaults.get(name)
+        return format_user_name(display_name, name) if display_name else name
+
+    # キャッシュにないユーザーをユーザー検索APIでまとめて取得する（同じユーザーは1回のみ）
+    def resolve(self, client, names):
+        for name in sorted({name for name in names if name and self.get(name) is None}):
+            try:
+                res = client.get("/rest/api/2/user/search", params={"username": name, "maxResults": 10})
+                res.raise_for_status()
+                for user in res.json():
+                    self.add(user)
+            except Exception as e:
+                logger.error(f"ユーザー情報の取得失敗 ({name}): {str(e)}")
+
+    # 有効期間を過ぎたユーザー情報をキャッシュから削除する
+    def prune(self):
+        cutoff = time.time() - self.ttl
+        with self.lock:
+            for name in [name for name, entry in self.users.items() if entry[1] < cutoff]:
+                del self.users[name]
+                self.dirty.discard(name)
+        return cutoff
+
+    # 同期状態ファイルから有効期間内のユーザー情報を読み込む
+    def load(self, state):
+        self.prune()
+        for name, display_name, fetched_at in state.get_users(time.time() - self.ttl):
+            self.add({"name": name, "displayName": display_name}, fetched_at)
+
+    # 新しく登録したユーザー情報を同期状態ファイルに書き込み、有効期間を過ぎたものを削除する
+    # （コミットは呼び出し側で行う）
+    def save(self, state):
+        state.delete_users(self.prune())
+        with self.lock:
+            rows = [(name, *self.users[name]) for name in self.dirty]
+            self.dirty = set()
+        state.set_users(rows)
+
+# Excel行からJIRAへ送信する値（サマリ・説明・期限・コメント）を取り出す
+def get_push_fields(row, project_key):
     summary_value = str(row.get("Summary", "")).strip()
     summary = ensure_summary_header(summary_value, project_key)
     description_raw = row.get("Description", "")
@@ -61,152 +468,646 @@ def create_jira_ticket(jira_url, headers, project_key, row, idx, df):
     due_date_raw = row.get("Due Date", "")
     due_date_str = str(due_date_raw) if pd.notna(due_date_raw) else None
     comment = str(row.get("Comment", "")) if pd.notna(row.get("Comment")) else None
+    return summary, description, due_date_str, comment
+
+# 期限の比較用の正規化（Excelの日時 "2024-05-01 00:00:00" とJIRAの "2024-05-01" を同一視する）
+def normalize_due_date(value):
+    if not value:
+        return None
+    value = str(value)
+    if len(value) >= 10 and value[4] == "-" and value[7] == "-":
+        return value[:10]
+    return value
+
+# Excelの値とJIRAの現在値を比較し、変更のあるフィールドのみを返す
+def get_changed_fields(fields, snapshot):
+    changed = {}
+    for name, value in fields.items():
+        current = snapshot.get(name)
+        if name == "duedate":
+            if normalize_due_date(value) == normalize_due_date(current):
+                continue
+        elif (value or "") == (current or ""):
+            continue
+        changed[name] = value
+    return changed
+
+# JIRAへ送信する内容のハッシュ（前回送信時から変更があったかの判定用）
+def row_content_hash(row, project_key):
+    content = json.dumps(get_push_fields(row, project_key), ensure_ascii=False)
+    return hashlib.sha1(content.encode("utf-8")).hexdigest()
+
+# 同期状態ファイルのパス（ワークブックと同じ場所に保存）
+def get_sync_state_path(excel_path):
+    return os.path.splitext(excel_path)[0] + "_sync_state.db"
+
+# Excelファイルの変更検出用の情報（inode・更新日時・サイズ）。ファイルがなければNone
+def get_file_signature(path):
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    return stat.st_ino, stat.st_mtime_ns, stat.st_size
+
+# 差分同期用の状態ストア（SQLite）
+# 最終同期時刻（ウォーターマーク）と、チケットごとに最後に送信した内容のハッシュを保持する
+class SyncState:
+    def __init__(self, path):
+        self.path = path
+        self.conn = sqlite3.connect(path)
+        self.conn.execute("CREATE TABLE IF NOT EXISTS meta (name TEXT PRIMARY KEY, value TEXT)")
+        self.conn.execute("CREATE TABLE IF NOT EXISTS tickets (key TEXT PRIMARY KEY, hash TEXT)")
+        self.conn.execute("CREATE TABLE IF NOT EXISTS users (name TEXT PRIMARY KEY, display_name TEXT, fetched_at REAL)")
+        self.conn.commit()
+
+    def get_meta(self, name):
+        row = self.conn.execute("SELECT value FROM meta WHERE name = ?", (name,)).fetchone()
+        return row[0] if row else None
+
+    def set_meta(self, name, value):
+        self.conn.execute("INSERT OR REPLACE INTO meta (name, value) VALUES (?, ?)", (name, value))
+
+    # 前回同期の開始時刻（datetime）。未同期ならNone
+    # タイムゾーン付きで保存する。以前の形式（タイムゾーンなし）はこのホストのローカル時刻とみなす
+    def get_watermark(self):
+        value = self.get_meta("watermark")
+        return datetime.fromisoformat(value).astimezone() if value else None
+
+    def set_watermark(self, value):
+        self.set_meta("watermark", value.isoformat())
+
+    def get_hash(self, key):
+        row = self.conn.execute("SELECT hash FROM tickets WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else None
+
+    def set_hashes(self, hashes):
+        self.conn.executemany("INSERT OR REPLACE INTO tickets (key, hash) VALUES (?, ?)", hashes.items())
+
+    # ユーザー情報のキャッシュ (アカウント名, 表示名, 登録時刻)。fetched_after以降に登録したもののみ
+    def get_users(self, fetched_after):
+        return self.conn.execute("SELECT name, display_name, fetched_at FROM users WHERE fetched_at >= ?",
+                                 (fetched_after,)).fetchall()
+
+    def set_users(self, rows):
+        self.conn.executemany("INSERT OR REPLACE INTO users (name, display_name, fetched_at) VALUES (?, ?, ?)", rows)
+
+    def delete_users(self, fetched_before):
+        self.conn.execute("DELETE FROM users WHERE fetched_at < ?", (fetched_before,))
+
+    def commit(self):
+        self.conn.commit()
+
+    def close(self):
+        self.conn.close()
+
+# Excel行の索引（No.→行、チケットキー→行）
+# 列全体の走査は作成時の1回のみ（ベクトル演算）で、行の追加・キーの設定に合わせて更新する
+class RowIndex:
+    def __init__(self, df):
+        self.no_to_idx = {}
+        self.key_to_idx = {}
+        self.max_no = None
+        if "No." in df.columns:
+            numbers = pd.to_numeric(df["No."], errors="coerce").dropna()
+            if not numbers.empty:
+                self.max_no = numbers.max()
+            # 同じNo.が複数ある場合は先頭の行を使う
+            numbers = numbers[~numbers.duplicated()]
+            self.no_to_idx = dict(zip(numbers.tolist(), numbers.index))
+        if "Ticket Key" in df.columns:
+            # 同じキーが複数ある場合は後ろの行を使う
+            keys = df["Ticket Key"].dropna()
+            keys = keys[keys != ""]
+            self.key_to_idx = dict(zip(keys.tolist(), keys.index))
+
+    # No.が1以上の整数の行を、No.の昇順で返す
+    def ordered_indices(self):
+        return [self.no_to_idx[no] for no in sorted(self.no_to_idx)
+                if no >= 1 and float(no).is_integer()]
+
+    # 次に追加する行のNo.
+    def next_no(self):
+        return self.max_no + 1 if self.max_no is not None else 1
+
+    def set_key(self, key, idx):
+        self.key_to_idx[key] = idx
+
+    def add(self, idx, no, key=None):
+        self.no_to_idx.setdefault(no, idx)
+        if self.max_no is None or no > self.max_no:
+            self.max_no = no
+        if key:
+            self.key_to_idx[key] = idx
+
+# 並列実行時のログバッファ
+# ワーカースレッドのログを一旦ためておき、メインスレッドで行順に出力する
+class BufferedLog:
+    def __init__(self):
+        self.records = []
+
+    def info(self, msg):
+        self.records.append((logging.INFO, msg))
+
+    def warning(self, msg):
+        self.records.append((logging.WARNING, msg))
+
+    def error(self, msg):
+        self.records.append((logging.ERROR, msg))
+
+    def flush(self, target=logger):
+        for level, msg in self.records:
+            target.log(level, msg)
+        self.records = []
 
-    logger.info("+ 新規作成 (Subaru)")
+# メインシートへの変更の記録
+# 保存時は記録したセルと追加行のみをシートへ書き戻す
+class SheetChanges:
+    def __init__(self, loaded_rows):
+        self.loaded_rows = loaded_rows  # 読み込み時の行数（これ以降の行は追加行）
+        self.cells = set()  # 変更したセル (行インデックス, 列名)
+        self.structure_changed = False  # 列の追加など、シート全体の書き直しが必要な変更
+
+    def mark(self, idx, column):
+        if idx < self.loaded_rows:
+            self.cells.add((idx, column))
+
+    def has_changes(self, df):
+        return self.structure_changed or bool(self.cells) or len(df) > self.loaded_rows
+
+# DataFrameのセルへ書き込み、変更として記録する
+def set_cell(df, idx, column, value, changes=None):
+    df.at[idx, column] = value
+    if changes is not None:
+        changes.mark(idx, column)
+
+# チケット処理結果のDataFrameへの書き込み（メインスレッドでのみ呼び出す）
+def apply_row_updates(df, idx, updates, changes=None):
+    for column, value in updates.items():
+        set_cell(df, idx, column, value, changes)
+
+# JIRAに新規チケットを作成する
+# DataFrameへの書き込み内容は updates として返す（途中で失敗した場合もそれまでの分を返す）
+def create_jira_ticket(client, project_key, row, log=logger):
+    summary, description, due_date_str, comment = get_push_fields(row, project_key)
+    updates = {}
+
+    log.info("+ 新規作成 (Subaru)")
     
     try:
         # JIRAの課題作成APIへ送信
-        payload = {
-            "fields": {
-                "project": {"key": project_key},
-                "summary": summary,
-                "description": description,
-                "duedate": due_date_str,
-                "issuetype": {"name": "Task"},
-                "labels": ["Customer_QA"],
-                "assignee": {"name": "uig17323"}  # APIユーザーに自動アサイン
-            }
-        }
+        payload = {"fields": build_create_fields(project_key, summary, description, due_date_str)}
         
-        res = requests.post(f"{jira_url}/rest/api/2/issue", headers=headers, json=payload)
+        res = client.post("/rest/api/2/issue", json=payload)
         res.raise_for_status()
         
         new_key = res.json()["key"]
-        new_url = f"{jira_url}/browse/{new_key}"
-        df.at[idx, "Ticket URL"] = new_url
-        df.at[idx, "Ticket Key"] = new_key
-        logger.info(f"✓ 作成: {new_key}")
-        
-        # コメントがあれば追加
-        if comment:
-            comment_url = f"{jira_url}/rest/api/2/issue/{new_key}/comment"
-            comment_res = requests.post(comment_url, headers=headers, json={"body": comment})
-            comment_res.raise_for_status()
-            
-        df.at[idx, "Sync"] = ""
-        df.at[idx, "Assignee"] = "Harada, Naohisa (uig17323)"
-        return True, new_key
+        finish_created_ticket(client, new_key, comment, updates, log)
+        return True, new_key, updates
         
     except Exception as e:
-        logger.error(f"x 作成失敗: {str(e)}")
-        return False, None
+        log.error(f"x 作成失敗: {str(e)}")
+        return False, None, updates
+
+# 新規チケットの担当者（APIユーザー）のアカウント名
+CREATE_ASSIGNEE = "uig17323"
+# ユーザー情報を取得できなかった場合に使う、新規チケットの担当者の表示名
+CREATE_ASSIGNEE_DISPLAY_NAME = "Harada, Naohisa"
+
+# 新規チケットの作成内容
+def build_create_fields(project_key, summary, description, due_date_str):
+    return {
+        "project": {"key": project_key},
+        "summary": summary,
+        "description": description,
+        "duedate": due_date_str,
+        "issuetype": {"name": "Task"},
+        "labels": ["Customer_QA"],
+        "assignee": {"name": CREATE_ASSIGNEE}  # APIユーザーに自動アサイン
+    }
+
+# 作成済みチケットのExcelへの反映内容を記録し、コメントがあれば追加する
+# コメント追加に失敗した場合は例外を送出する（URLとキーはupdatesに記録済み）
+def finish_created_ticket(client, new_key, comment, updates, log=logger):
+    new_url = client.browse_url(new_key)
+    updates["Ticket URL"] = new_url
+    updates["Ticket Key"] = new_key
+    log.info(f"✓ 作成: {new_key}")
+    
+    # コメントがあれば追加
+    if comment:
+        comment_res = client.post(f"/rest/api/2/issue/{new_key}/comment", json={"body": comment})
+        comment_res.raise_for_status()
+        
+    updates["Sync"] = ""
+    updates["Assignee"] = client.users.format_name(CREATE_ASSIGNEE)
+
+# 一括作成APIで1回に送信するチケット数
+BULK_CREATE_CHUNK_SIZE = 50
+# 一括作成後のコメント追加の並列数（workersの方が大きい場合はそちらを使う）
+BULK_COMMENT_WORKERS = 4
+
+# 一括作成APIが使えないことを示すステータス（1件ずつの作成に切り替える）
+BULK_CREATE_UNSUPPORTED_STATUSES = {404, 405}
+
+# 接続前に失敗した（リクエストがサーバに届いていない）通信エラーかどうか
+# 送信後のタイムアウトや切断はサーバ側で処理済みの可能性があるためFalse
+def is_unsent_request_error(e):
+    if isinstance(e, requests.exceptions.ConnectTimeout):
+        return True
+    if not isinstance(e, requests.exceptions.ConnectionError) or not e.args:
+        return False
+    reason = getattr(e.args[0], "reason", e.args[0])
+    return isinstance(reason, (urllib3_exceptions.NewConnectionError, urllib3_exceptions.ConnectTimeoutError))
+
+# 新規作成タスクをJIRAの一括作成API（/rest/api/2/issue/bulk）でまとめて作成する
+# 戻り値: {行インデックス: (BufferedLog, (成功したか, 新キー, DataFrameへの書き込み内容))}
+# ログはタスクごとにバッファし、呼び出し側が行順に出力する
+def bulk_create_jira_tickets(client, project_key, tasks, workers=1):
+    results = {}
+    created = []  # (タスク, ログ, 新キー, コメント, 書き込み内容)
+
+    for start in range(0, len(tasks), BULK_CREATE_CHUNK_SIZE):
+        chunk = tasks[start:start + BULK_CREATE_CHUNK_SIZE]
+        logs = [BufferedLog() for _ in chunk]
+        push_fields = [get_push_fields(task.row, project_key) for task in chunk]
+        for log in logs:
+            log.info("+ 新規作成 (Subaru)")
+
+        # 一括作成APIが使えない場合（リクエストがJIRAで処理されていないことが確実な場合のみ）は1件ずつ作成する
+        def create_one_by_one(reason):
+            logger.warning(f"一括作成失敗のため1件ずつ作成します: {reason}")
+            for task, log in zip(chunk, logs):
+                log.records = []
+                results[task.idx] = (log, create_jira_ticket(client, project_key, task.row, log))
+
+        # 作成されたか分からない場合も含め、チャンク全体を失敗とする（重複作成を避けるため再送しない）
+        def fail_chunk(reason):
+            logger.error(f"一括作成失敗 ({len(chunk)}件): {reason}")
+            for task, log in zip(chunk, logs):
+                log.error(f"x 作成失敗: {reason}")
+                results[task.idx] = (log, (False, None, {}))
+
+        try:
+            issue_updates = [{"fields": build_create_fields(project_key, *fields[:3])} for fields in push_fields]
+            res = client.post("/rest/api/2/issue/bulk", json={"issueUpdates": issue_updates})
+        except Exception as e:
+            if is_unsent_request_error(e):
+                create_one_by_one(str(e))
+            else:
+                fail_chunk(str(e))
+            continue
+        if res.status_code in BULK_CREATE_UNSUPPORTED_STATUSES:
+            create_one_by_one(f"HTTP {res.status_code}")
+            continue
+
+        try:
+            # 一部のみ失敗した場合は400で、作成済み分と失敗分（要素ごとのエラーのリスト）の両方が返る
+            if res.status_code != 400:
+                res.raise_for_status()
+            body = res.json()
+            element_errors = body.get("errors", [])
+            if not isinstance(element_errors, list):
+                # 要素ごとではない通常の400エラー（{"errorMessages": [...], "errors": {"項目": "内容"}}）
+                raise ValueError(f"HTTP {res.status_code}: {body.get('errorMessages')} {element_errors}")
+            # 失敗した要素の番号を除いた順に、作成されたチケットが返る
+            errors = {error.get("failedElementNumber"): error for error in element_errors}
+            created_issues = iter(body.get("issues", []))
+        except Exception as e:
+            fail_chunk(str(e))
+            continue
+
+        for number, (task, log, fields) in enumerate(zip(chunk, logs, push_fields)):
+            error = errors.get(number)
+            issue = None if error else next(created_issues, None)
+            if issue is None:
+                detail = error.get("elementErrors", error) if error else "レスポンスにチケットがありません"
+                log.error(f"x 作成失敗: {detail}")
+                results[task.idx] = (log, (False, None, {}))
+            else:
+                created.append((task, log, issue["key"], fields[3], {}))
+
+    # 作成したチケットへのコメント追加を並列実行する
+    def finish(item):
+        task, log, new_key, comment, updates = item
+        try:
+            finish_created_ticket(client, new_key, comment, updates, log)
+            return True, new_key, updates
+        except Exception as e:
+            log.error(f"x 作成失敗: {str(e)}")
+            return False, None, updates
+
+    with ThreadPoolExecutor(max_workers=max(workers, BULK_COMMENT_WORKERS)) as executor:
+        for item, result in zip(created, executor.map(finish, created)):
+            results[item[0].idx] = (item[1], result)
+    return results
+
+# チケットの現在のAssignee（Excelに転記する形式）
+# 更新ではAssigneeを変更しないため、検索結果（snapshot）の値をそのまま使える
+# （検索結果を取得できなかった場合のみチケットを取得する）
+def get_current_assignee_name(client, key, snapshot=None):
+    if snapshot is not None:
+        return get_jira_assignee_name(snapshot, client.users)
+    issue_res = client.get(f"/rest/api/2/issue/{key}", params={"fields": "assignee"})
+    issue_res.raise_for_status()
+    return get_jira_assignee_name(issue_res.json().get("fields", {}), client.users)
 
 # 既存のJIRAチケットを更新する
-def update_jira_ticket(jira_url, headers, project_key, row, idx, df, key):
-    summary_value = str(row.get("Summary", "")).strip()
-    summary = ensure_summary_header(summary_value, project_key)
-    description_raw = row.get("Description", "")
-    description = str(description_raw) if pd.notna(description_raw) else ""
-    due_date_raw = row.get("Due Date", "")
-    due_date_str = str(due_date_raw) if pd.notna(due_date_raw) else None
-    comment = str(row.get("Comment", "")) if pd.notna(row.get("Comment")) else None
+# DataFrameへの書き込み内容は updates として返す
+# snapshotにJIRA側の現在値（fetch_issue_snapshotsの結果）を渡すと、
+# 変更のあるフィールドとコメントのみ送信し、Assigneeの再取得も省略する
+def update_jira_ticket(client, project_key, row, key, log=logger, snapshot=None):
+    summary, description, due_date_str, comment = get_push_fields(row, project_key)
+    updates = {}
 
-    logger.info(f".. 更新: {key} (Subaru)")
+    log.info(f".. 更新: {key} (Subaru)")
     
     try:
         # JIRA課題更新APIでサマリ・説明・期限を更新
-        update_url = f"{jira_url}/rest/api/2/issue/{key}"
-        payload = {
-            "fields": {
-                "summary": summary,
-                "description": description,
-                "duedate": due_date_str
-            }
+        fields = {
+            "summary": summary,
+            "description": description,
+            "duedate": due_date_str
         }
+        if snapshot is not None:
+            fields = get_changed_fields(fields, snapshot)
         
-        res = requests.put(update_url, headers=headers, json=payload)
-        res.raise_for_status()
-        logger.info(f"✓ 更新成功: {key}")
+        if fields:
+            res = client.put(f"/rest/api/2/issue/{key}", json={"fields": fields})
+            res.raise_for_status()
+            log.info(f"✓ 更新成功: {key}")
+        else:
+            log.info(f"変更なし (JIRAと一致): {key}")
         
         # コメントがあれば追加
         if comment:
-            # 現在のコメントを取得して比較
-            current_comment = get_last_comment(jira_url, key, headers)
+            # 現在のコメントと比較（検索結果のコメントが不完全な場合のみ取得する）
+            if snapshot is not None and snapshot["last_comment"] is not None:
+                current_comment = snapshot["last_comment"]
+            else:
+                current_comment = get_last_comment(client, key, log)
             if current_comment != comment:
-                comment_url = f"{jira_url}/rest/api/2/issue/{key}/comment"
-                comment_res = requests.post(comment_url, headers=headers, json={"body": comment})
+                comment_res = client.post(f"/rest/api/2/issue/{key}/comment", json={"body": comment})
                 comment_res.raise_for_status()
-                logger.info(f"✓ コメント追加: {key}")
+                log.info(f"✓ コメント追加: {key}")
             
-        df.at[idx, "Sync"] = ""
+        updates["Sync"] = ""
 
         # Assignee を JIRA から取得し Excel に反映（確実な一致を保証）
-        issue_res = requests.get(f"{jira_url}/rest/api/2/issue/{key}?fields=assignee", headers=headers)
-        issue_res.raise_for_status()
-        assignee_name = get_jira_assignee_name(issue_res.json().get("fields", {}))
+        assignee_name = get_current_assignee_name(client, key, snapshot)
         if assignee_name:
-            df.at[idx, "Assignee"] = assignee_name
+            updates["Assignee"] = assignee_name
             
-        return True
+        return True, updates
         
     except Exception as e:
-        logger.error(f"! 更新失敗: {str(e)}")
-        return False
+        log.error(f"! 更新失敗: {str(e)}")
+        return False, updates
+
+# Excel行ごとの処理内容
+# kind: "create" / "update" / "unchanged" / "skip"（skipの場合はmessageをログ出力するだけ）
+# snapshotは更新対象チケットのJIRA側の現在値（取得できなかった場合はNone）
+RowTask = namedtuple("RowTask", ["kind", "idx", "row", "key", "message", "snapshot"],
+                     defaults=[None, None, None, None, None])
+
+# 行ごとの処理（作成・更新・スキップ）を1件実行する
+# 戻り値: (成功したか, 対象キー, DataFrameへの書き込み内容)
+def run_row_task(client, project_key, task, log=logger):
+    if task.kind == "create":
+        return create_jira_ticket(client, project_key, task.row, log)
+    if task.kind == "update":
+        success, updates = update_jira_ticket(client, project_key, task.row, task.key, log, task.snapshot)
+        return success, task.key, updates
+    if task.kind == "unchanged":
+        # 前回送信時から内容が変わっていないためJIRAへは送信しない
+        # 更新した場合と同じく、Syncを解除してAssigneeをJIRAの値に戻す
+        log.info(f"変更なし: {task.key}")
+        updates = {"Sync": ""}
+        try:
+            assignee_name = get_current_assignee_name(client, task.key, task.snapshot)
+            if assignee_name:
+                updates["Assignee"] = assignee_name
+        except Exception as e:
+            log.error(f"! Assignee取得失敗: {str(e)}")
+        return False, task.key, updates
+    log.info(task.message)
+    return False, None, {}
+
+# 行ごとの処理をまとめて実行する
+# workers > 1 の場合はスレッドプールで並列実行するが、結果とログは
+# 常にタスクの順番どおりに返すため、統計やログ出力は逐次実行と同じになる
+def execute_row_tasks(client, project_key, tasks, workers=1):
+    # 新規作成は一括作成APIでまとめて先に実行し、結果は行順の位置で返す
+    create_tasks = [task for task in tasks if task.kind == "create"]
+    if create_tasks:
+        # 新規チケットの担当者の表示名はキャッシュになければ1回だけ取得する
+        client.users.resolve(client, [CREATE_ASSIGNEE])
+    created = bulk_create_jira_tickets(client, project_key, create_tasks, workers) if create_tasks else {}
+
+    if workers <= 1:
+        for task in tasks:
+            if task.kind == "create":
+                log, result = created[task.idx]
+                log.flush()
+                yield task, result
+            else:
+                yield task, run_row_task(client, project_key, task)
+        return
+
+    def worker(task):
+        if task.kind == "create":
+            return created[task.idx]
+        log = BufferedLog()
+        return log, run_row_task(client, project_key, task, log)
+
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        for task, (log, result) in zip(tasks, executor.map(worker, tasks)):
+            log.flush()
+            yield task, result
+
+# JQL検索の1ページあたりの件数（サーバ側の上限を超える値は切り詰められる）
+SEARCH_PAGE_SIZE = 100
+
+# JQL検索結果をチケット1件ずつ返すジェネレータ
+# startAt/totalに従って全ページを辿り、現在のページを処理している間に次のページを先読みする
+# 保持するのは処理中のページと先読み中のページのみ
+def search_issues(client, jql, fields=None, page_size=SEARCH_PAGE_SIZE, extra_params=None):
+    def fetch(start_at):
+        params = dict(extra_params or {})
+        params.update({"jql": jql, "startAt": start_at, "maxResults": page_size})
+        if fields:
+            params["fields"] = ",".join(fields)
+        res = client.get("/rest/api/2/search", params=params)
+        res.raise_for_status()
+        return res.json()
+
+    with ThreadPoolExecutor(max_workers=1) as prefetcher:
+        page = fetch(0)
+        while True:
+            issues = page.get("issues", [])
+            # サーバがmaxResultsを切り詰める場合があるため、実際の件数で次の位置を決める
+            next_start = page.get("startAt", 0) + len(issues)
+            next_page = None
+            if issues and next_start < page.get("total", 0):
+                next_page = prefetcher.submit(fetch, next_start)
+            page = None
+            yield from issues
+            if next_page is None:
+                return
+            page = next_page.result()
+
+# インポート時に検索結果へ含めるフィールド（コメントも同じレスポンスで取得する）
+IMPORT_FIELDS = ["summary", "description", "duedate", "assignee", "status", "updated", "comment"]
+
+# 変更検出用に取得するフィールド
+SNAPSHOT_FIELDS = ["summary", "description", "duedate", "assignee", "comment"]
+# 1回のJQL（key in (...)）で問い合わせるチケット数
+SNAPSHOT_CHUNK_SIZE = 50
+
+# チケットの現在値を変更検出用の形にまとめる
+# last_commentはコメント一覧が切り詰められていて判定できない場合None
+def make_issue_snapshot(fields):
+    comment_info = fields.get("comment") or {}
+    comments = comment_info.get("comments", [])
+    if len(comments) < comment_info.get("total", len(comments)):
+        last_comment = None
+    else:
+        last_comment = comments[-1]["body"] if comments else ""
+    return {
+        "summary": fields.get("summary"),
+        "description": fields.get("description"),
+        "duedate": fields.get("duedate"),
+        "assignee": fields.get("assignee"),
+        "last_comment": last_comment,
+    }
+
+# 更新対象チケットの現在値をまとめて取得する（チケットごとのGETを行わない）
+# 取得に失敗したチャンクのチケットは結果に含まれず、更新時に従来どおり個別に確認する
+def fetch_issue_snapshots(client, keys):
+    snapshots = {}
+    keys = list(keys)
+    for start in range(0, len(keys), SNAPSHOT_CHUNK_SIZE):
+        chunk = keys[start:start + SNAPSHOT_CHUNK_SIZE]
+        jql = f'key in ({", ".join(chunk)})'
+        try:
+            # 削除済みなど存在しないキーがあってもエラーにしない
+            for issue in search_issues(client, jql, SNAPSHOT_FIELDS, extra_params={"validateQuery": "warn"}):
+                snapshots[issue["key"]] = make_issue_snapshot(issue["fields"])
+        except Exception as e:
+            logger.warning(f"チケットの現在値の一括取得に失敗: {str(e)}")
+    return snapshots
+
+# JIRA REST APIの日時のフォーマット（serverTime・updatedなど）
+JIRA_DATETIME_FORMAT = "%Y-%m-%dT%H:%M:%S.%f%z"
+# 差分同期時のウォーターマークの余裕（JQLの分単位の精度と時計のずれを吸収する）
+WATERMARK_MARGIN = timedelta(minutes=5)
+
+# JIRAサーバの現在時刻（タイムゾーン付き）。差分同期のウォーターマークに使う
+# 取得できない場合はこのホストの現在時刻（タイムゾーン付き）を使う
+def get_jira_server_time(client):
+    try:
+        res = client.get("/rest/api/2/serverInfo")
+        res.raise_for_status()
+        return datetime.strptime(res.json()["serverTime"], JIRA_DATETIME_FORMAT)
+    except Exception as e:
+        logger.warning(f"JIRAサーバの時刻を取得できないため、このホストの時刻を使います: {str(e)}")
+        return datetime.now().astimezone()
+
+# インポートで追加する行の列（No.は追加時に採番する）
+IMPORT_COLUMNS = ["Ticket URL", "Ticket Key", "Summary", "Assignee", "Description", "Due Date", "Comment", "Sync", "Status"]
+
+# 列ごとのバッファにためた新規行にNo.を連番で採番し、DataFrameの末尾に追加する
+def append_imported_rows(df, new_rows, row_index):
+    count = len(new_rows["Ticket Key"])
+    start_no = row_index.next_no()
+    new_df = pd.DataFrame({"No.": start_no + np.arange(count), **new_rows})
+    start_idx = len(df)
+    df = pd.concat([df, new_df], ignore_index=True)
+    for offset, (no, key) in enumerate(zip(new_df["No."].tolist(), new_rows["Ticket Key"])):
+        row_index.add(start_idx + offset, no, key)
+    return df
+
+# インポート対象のチケットを検索するJQL
+# updated_sinceは日時ではなく「nowから何分前以降」の相対指定にする
+# （JQLの日時はAPIユーザーのプロフィールのタイムゾーンで解釈されるため、このホストとずれる場合がある）
+# nowはupdated_sinceと同じ時計（JIRAサーバの時刻）で、省略時はこのホストの現在時刻
+def build_import_jql(project_key, updated_since=None, now=None):
+    jql = f'project = {project_key} AND labels = Customer_QA AND status NOT IN (Done, CANCELED)'
+    if updated_since is not None:
+        now = now or datetime.now(timezone.utc)
+        minutes = max(1, math.ceil((now - updated_since).total_seconds() / 60))
+        jql += f' AND updated >= "-{minutes}m"'
+    return jql
+
+# インポート対象の件数と最終更新日時のみを取得する（監視モードでの変更検出用、1リクエスト）
+# 戻り値: (件数, 最も新しい更新日時)。取得に失敗した場合はNone
+def probe_jira_updates(client, project_key):
+    try:
+        res = client.get("/rest/api/2/search", params={
+            "jql": build_import_jql(project_key) + " ORDER BY updated DESC",
+            "maxResults": 1,
+            "fields": "updated",
+        })
+        res.raise_for_status()
+        data = res.json()
+        issues = data.get("issues", [])
+        return data.get("total", 0), issues[0]["fields"].get("updated") if issues else None
+    except Exception as e:
+        logger.error(f"JIRAの更新確認失敗: {str(e)}")
+        return None
 
 # JIRAからチケットを検索し、Excelに存在しないものを追加
-def import_jira_tickets(jira_url, headers, project_key, df):
+# updated_sinceを指定した場合はその日時以降に更新されたチケットのみを対象とする
+# row_indexはExcel行の索引（追加した行も登録する）、changesには既存行への書き込みを記録する
+# 戻り値: (DataFrame, 追加数, 更新数, 成功したか)
+def import_jira_tickets(client, project_key, df, row_index, updated_since=None, changes=None, now=None):
     logger.info("JIRAからチケットをインポート開始")
     added_count = 0
     updated_count = 0
     
     try:
         # JQLクエリでCustomer_QAラベルかつDone/CANCELED以外のチケットを検索
-        jql = f'project = {project_key} AND labels = Customer_QA AND status NOT IN (Done, CANCELED)'
-        res = requests.get(f"{jira_url}/rest/api/2/search?jql={jql}&maxResults=1000", headers=headers)
-        res.raise_for_status()
+        jql = build_import_jql(project_key, updated_since, now)
         
-        issues = res.json().get("issues", [])
-        logger.info(f"JIRAから取得したチケット数: {len(issues)}")
+        # キーとExcelの行インデックスのマッピング
+        existing_keys = row_index.key_to_idx
         
-        # 現在のExcelのURLからキーのリストを作成
-        existing_keys = {}  # キーとExcelの行インデックスのマッピング
-        for idx, row in df.iterrows():
-            url = row.get("Ticket URL", "")
-            if pd.notna(url) and url:
-                key = url.split('/')[-1]
-                existing_keys[key] = idx
+        # Excelに存在しないチケットは列ごとのバッファにためて最後に一括で追加する
+        new_rows = {column: [] for column in IMPORT_COLUMNS}
+        new_keys = set()
         
-        for issue in issues:
+        # 検索結果はページ単位で逐次処理する
+        fetched_count = 0
+        for issue in search_issues(client, jql, IMPORT_FIELDS):
+            fetched_count += 1
             key = issue["key"]
-            url = f"{jira_url}/browse/{key}"
+            url = client.browse_url(key)
             
-            # Excel内に存在するかチェック
+            # Excel内に存在するかチェック（同じ実行で追加済みのものも除く）
+            if key in new_keys:
+                continue
             if key not in existing_keys:
                 # 新規追加
                 fields = issue["fields"]
                 summary = fields.get("summary", "")
                 description = fields.get("description", "") or ""
                 due_date = fields.get("duedate", "")
-                comment = get_last_comment(jira_url, key, headers)
-                assignee_name = get_jira_assignee_name(fields)
-                
-                # 次のNo.値を取得
-                next_no = df["No."].dropna().max() + 1 if not df["No."].dropna().empty else 1
+                comment = get_last_comment_from_fields(client, key, fields)
+                assignee_name = get_jira_assignee_name(fields, client.users)
                 
-                # 新規行をDataFrameに追加
-                new_row = pd.DataFrame.from_records([{
-                    "No.": next_no,
-                    "Ticket URL": url,
-                    "Summary": summary,
-                    "Assignee": assignee_name or "Subaru",  # アサイニーがない場合はSubaruをデフォルト値に
-                    "Description": description,
-                    "Due Date": due_date,
-                    "Comment": comment,
-                    "Sync": "",
-                    "Status": ""
-                }])
-                
-                df = pd.concat([df, new_row], ignore_index=True)
+                # 新規行をバッファに追加（No.は最後にまとめて採番する）
+                for column, value in (
+                    ("Ticket URL", url),
+                    ("Ticket Key", key),
+                    ("Summary", summary),
+                    ("Assignee", assignee_name or "Subaru"),  # アサイニーがない場合はSubaruをデフォルト値に
+                    ("Description", description),
+                    ("Due Date", due_date),
+                    ("Comment", comment),
+                    ("Sync", ""),
+                    ("Status", ""),
+                ):
+                    new_rows[column].append(value)
+                new_keys.add(key)
                 added_count += 1
                 logger.info(f"Excelに追加: {key} - {summary}")
             else:
@@ -215,7 +1116,7 @@ def import_jira_tickets(jira_url, headers, project_key, df):
                 
                 # アサイニーの確認と更新
                 fields = issue["fields"]
-                assignee_name = get_jira_assignee_name(fields)
+                assignee_name = get_jira_assignee_name(fields, client.users)
                 current_assignee = df.at[idx, "Assignee"] if pd.notna(df.at[idx, "Assignee"]) else ""
                 is_subaru = current_assignee.strip().lower() == "subaru"
                 
@@ -223,7 +1124,7 @@ def import_jira_tickets(jira_url, headers, project_key, df):
                 status = str(df.at[idx, "Status"]).strip().lower()
                 if status != "done":
                     # コメントの更新
-                    jira_comment = get_last_comment(jira_url, key, headers)
+                    jira_comment = get_last_comment_from_fields(client, key, fields)
                     excel_comment = df.at[idx, "Comment"] if pd.notna(df.at[idx, "Comment"]) else ""
                     
                     # アサイニーがSubaruの場合
@@ -234,13 +1135,13 @@ def import_jira_tickets(jira_url, headers, project_key, df):
                         if sync_value == "〇":
                             # Syncがある場合のみJIRAの値で更新
                             if assignee_name:
-                                df.at[idx, "Assignee"] = assignee_name
+                                set_cell(df, idx, "Assignee", assignee_name, changes)
                                 logger.info(f"アサイニー更新: {key} - {assignee_name}")
                                 updated_count += 1
                             
                             # コメントも更新
                             if jira_comment and jira_comment != excel_comment:
-                                df.at[idx, "Comment"] = jira_comment
+                                set_cell(df, idx, "Comment", jira_comment, changes)
                                 logger.info(f"コメント更新 (Subaru担当): {key}")
                                 updated_count += 1
                         else:
@@ -251,26 +1152,194 @@ def import_jira_tickets(jira_url, headers, project_key, df):
                     elif not is_subaru:
                         # JIRAの最新コメントとExcelのコメントが異なる場合更新
                         if jira_comment and jira_comment != excel_comment:
-                            df.at[idx, "Comment"] = jira_comment
-                            df.at[idx, "Assignee"] = "Subaru"
+                            set_cell(df, idx, "Comment", jira_comment, changes)
+                            set_cell(df, idx, "Assignee", "Subaru", changes)
                             logger.info(f"コメント更新とSubaruへ担当変更: {key}")
                             updated_count += 1
                         
+        # バッファした新規行にNo.を採番し、DataFrameへ1回で追加する
+        if added_count:
+            df = append_imported_rows(df, new_rows, row_index)
+        
+        logger.info(f"JIRAから取得したチケット数: {fetched_count}")
         logger.info(f"JIRAからの更新完了。追加: {added_count}件、更新: {updated_count}件")
-        return df, added_count, updated_count
+        return df, added_count, updated_count, True
         
     except Exception as e:
         logger.error(f"JIRAからのインポート・更新失敗: {str(e)}")
-        return df, 0, 0
+        return df, 0, 0, False
 
 # 定数定義
 MAIN_SHEET_NAME = "main"  # メインシートの名前
 IMAGES_SHEET_NAME = "Imanges"  # 画像シートの名前（表記ゆれに対応）
 
-# Excelの書式を設定する（メインシートのみ）
+# 新規作成時のメインシートの列
+DEFAULT_COLUMNS = ["No.", "Ticket URL", "Summary", "Assignee", "Description", "Due Date", "Comment"]
+
+# ワークブックを1回だけ読み込み、メインシート（先頭シート）の内容をDataFrameにする
+# 画像シートなど他のシートはワークブックにそのまま残し、保存時もメインシートのセル値のみ書き換える
+# 戻り値: (ワークブック, メインシート, DataFrame, 列名→見出しセルの元の値)
+def load_sync_workbook(excel_path):
+    if not os.path.isfile(excel_path):
+        wb = openpyxl.Workbook()
+        ws = wb.active
+        ws.title = MAIN_SHEET_NAME
+        return wb, ws, pd.DataFrame(columns=DEFAULT_COLUMNS), {}
+
+    wb = openpyxl.load_workbook(excel_path)
+    ws = wb.worksheets[0]
+    # セルの値は数式ではなく、Excelが最後に計算した値を読む（No.の=ROW()-1など。pandas.read_excelと同じ）
+    # 保存には数式を保持したwbを使う
+    values_wb = openpyxl.load_workbook(excel_path, data_only=True, read_only=True)
+    try:
+        rows = values_wb.worksheets[0].iter_rows(values_only=True)
+        header = list(next(rows, ()))
+        records = [list(record) for record in rows]
+    finally:
+        values_wb.close()
+    # 末尾の空行は読み込まない
+    while records and all(value is None for value in records[-1]):
+        records.pop()
+    # 読み取り専用モードでは行ごとに長さが異なる場合があるため、最も長い行に揃える
+    width = max([len(header)] + [len(record) for record in records])
+    header += [None] * (width - len(header))
+    for record in records:
+        record += [None] * (width - len(record))
+    # 見出しが空の列は "Unnamed: n" として扱う（pandas.read_excelと同じ）
+    columns = [value if value is not None else f"Unnamed: {i}" for i, value in enumerate(header)]
+    df = pd.DataFrame.from_records(records, columns=columns) if records else pd.DataFrame(columns=columns)
+    # 最後の見出しより右にある、見出しも値もない列（書式だけ設定された列）は除く
+    # 途中の空列は残す（DataFrameの列位置をシートの列位置と一致させるため）
+    named = [i for i, value in enumerate(header) if value is not None]
+    last_named = named[-1] if named else -1
+    empty_columns = [name for i, (name, value) in enumerate(zip(columns, header))
+                     if i > last_named and df[name].isna().all()]
+    df = df.drop(columns=empty_columns)
+    header_values = {name: value for name, value in zip(columns, header)}
+    return wb, ws, df, header_values
+
+# DataFrameの内容をメインシートのセル値へ書き戻す（書式・ハイパーリンクには触れない）
+def write_main_sheet(ws, df, header_values):
+    for col, name in enumerate(df.columns, 1):
+        ws.cell(row=1, column=col).value = header_values.get(name, name)
+    for row, values in enumerate(df.itertuples(index=False, name=None), 2):
+        for col, value in enumerate(values, 1):
+            ws.cell(row=row, column=col).value = None if pd.isna(value) else value
+
+# 変更を記録したセルと追加行のみをメインシートへ書き込む
+# 戻り値: 書き込んだ追加行のシート上の行番号
+def patch_main_sheet(ws, df, changes):
+    positions = {name: col for col, name in enumerate(df.columns, 1)}
+    for idx, column in sorted(changes.cells):
+        # 処理用の列（Ticket Keyなど）はシートに存在しない
+        if column not in positions:
+            continue
+        value = df.at[idx, column]
+        ws.cell(row=idx + 2, column=positions[column]).value = None if pd.isna(value) else value
+
+    new_rows = []
+    appended = df.iloc[changes.loaded_rows:]
+    for row, values in enumerate(appended.itertuples(index=False, name=None), changes.loaded_rows + 2):
+        for col, value in enumerate(values, 1):
+            ws.cell(row=row, column=col).value = None if pd.isna(value) else value
+        new_rows.append(row)
+    return new_rows
+
+# 新規作成するファイルの権限（umaskを適用した0666。一時ファイルは0600で作成されるため）
+@lru_cache(maxsize=None)
+def new_file_mode():
+    umask = os.umask(0)
+    os.umask(umask)
+    return 0o666 & ~umask
+
+# ワークブックを一時ファイルに保存してから置き換える（保存途中で失敗しても元のファイルは壊れない）
+# 置き換え後も元のファイルの権限を保つ（他のユーザーが読み書きできなくならないように）
+def save_workbook_atomic(wb, excel_path):
+    directory = os.path.dirname(os.path.abspath(excel_path))
+    fd, temp_file = tempfile.mkstemp(suffix=".xlsx", dir=directory)
+    os.close(fd)
+    try:
+        wb.save(temp_file)
+        if os.path.exists(excel_path):
+            shutil.copymode(excel_path, temp_file)
+        else:
+            os.chmod(temp_file, new_file_mode())
+        os.replace(temp_file, excel_path)
+    except Exception:
+        if os.path.exists(temp_file):
+            os.remove(temp_file)
+        raise
+
+# メインシートの書式（スタイルオブジェクトはセルごとに作らず、1回だけ作成して共有する）
+CELL_STYLE_NAME = "jira_sync_cell"  # 罫線付きセルの名前付きスタイル
+FORMAT_COLUMNS = 9  # 書式を設定する列数（A-I列）
+# 偶数行のうちA-I列に値のある行（空行は塗らない。範囲は列全体のため追加行にも自動で適用される）
+BAND_FORMULA = 'AND(MOD(ROW(),2)=0,COUNTA($A1:$I1)>0)'
+BAND_RANGE = "A1:I1048576"
+OLD_BAND_FORMULAS = ["MOD(ROW(),2)=0"]  # 以前のバージョンが設定した、空行も塗るルール
+
+# 罫線付きのセルの罫線（openpyxlを読み込んだ後、初回に1回だけ作成する）
+@lru_cache(maxsize=None)
+def cell_border():
+    return styles.Border(
+        left=styles.Side(style='thin'),
+        right=styles.Side(style='thin'),
+        top=styles.Side(style='thin'),
+        bottom=styles.Side(style='thin')
+    )
+
+# 偶数行の背景色（薄緑）
+@lru_cache(maxsize=None)
+def band_fill():
+    return styles.PatternFill(start_color="CCFFCC", end_color="CCFFCC", fill_type="solid")
+
+# 罫線付きの名前付きスタイルをワークブックに1回だけ登録する
+def ensure_cell_style(wb):
+    if CELL_STYLE_NAME not in wb.named_styles:
+        wb.add_named_style(styles.NamedStyle(name=CELL_STYLE_NAME, border=cell_border()))
+    return CELL_STYLE_NAME
+
+# 偶数行の背景色はセルごとではなく、シートの条件付き書式1件で設定する
+# 以前のバージョンが設定したルールは置き換える
+def ensure_band_rule(ws):
+    found = False
+    emptied = []
+    for conditional_format in ws.conditional_formatting:
+        for rule in list(conditional_format.rules):
+            if rule.formula and rule.formula[0] in OLD_BAND_FORMULAS:
+                conditional_format.rules.remove(rule)
+            elif rule.formula and rule.formula[0] == BAND_FORMULA:
+                found = True
+        if not conditional_format.rules:
+            emptied.append(str(conditional_format.sqref))
+    for sqref in emptied:
+        del ws.conditional_formatting[sqref]
+    if found:
+        return
+    ws.conditional_formatting.add(BAND_RANGE, formatting_rule.FormulaRule(formula=[BAND_FORMULA], fill=band_fill()))
+
+# メインシートに書式を設定する（全セルに罫線、偶数行に背景色）
+# rowsを指定した場合はその行のみ（手動で設定した他の行の書式は変更しない）
+# 書式が未設定のセルには名前付きスタイルを、書式のあるセルには罫線のみを設定する
+def format_main_sheet(ws, rows=None):
+    style_name = ensure_cell_style(ws.parent)
+    ensure_band_rule(ws)
+    
+    for row in (range(1, ws.max_row + 1) if rows is None else rows):
+        for col in range(1, FORMAT_COLUMNS + 1):
+            cell = ws.cell(row=row, column=col)
+            if not cell.has_style:
+                cell.style = style_name
+            elif cell.border != cell_border():
+                cell.border = cell_border()
+    
+    # 他のシートには書式設定を適用しない
+    logger.info(f"シート '{ws.title}' のみに書式設定を適用しました")
+
+# Excelファイルの書式を設定する（メインシートのみ）
 def format_excel_file(excel_path):
     try:
-        wb = load_workbook(excel_path)
+        wb = openpyxl.load_workbook(excel_path)
         
         # メインシートを対象とする
         if MAIN_SHEET_NAME in wb.sheetnames:
@@ -280,29 +1349,8 @@ def format_excel_file(excel_path):
             ws = wb.active
             logger.warning(f"シート '{MAIN_SHEET_NAME}' が見つからないため、最初のシート '{ws.title}' に書式を適用します")
         
-        # 薄緑の背景色設定
-        fill = styles.PatternFill(start_color="CCFFCC", end_color="CCFFCC", fill_type="solid")
-        
-        # 罫線設定
-        border = styles.Border(
-            left=styles.Side(style='thin'),
-            right=styles.Side(style='thin'),
-            top=styles.Side(style='thin'),
-            bottom=styles.Side(style='thin')
-        )
-        
-        # 全セルに罫線を設定し、偶数行に背景色を設定（メインシートのみ）
-        for row in range(1, ws.max_row + 1):
-            for col in range(1, 10):  # A-I列
-                cell = ws.cell(row=row, column=col)
-                cell.border = border
-                if row % 2 == 0:  # 偶数行
-                    cell.fill = fill
-        
-        # 他のシートには書式設定を適用しない
-        logger.info(f"シート '{ws.title}' のみに書式設定を適用しました")
-                    
-        wb.save(excel_path)
+        format_main_sheet(ws)
+        save_workbook_atomic(wb, excel_path)
         logger.info("✓ Excel書式設定完了")
         return True
         
@@ -310,308 +1358,792 @@ def format_excel_file(excel_path):
         logger.error(f"Excel書式設定失敗: {str(e)}")
         return False
 
-# ExcelとJIRAを同期する主関数
-def sync_excel_and_jira(excel_path, project_key):
-    logger.info("ExcelとJIRAの同期処理を開始します")
-    
-    try:
-        # JIRA認証情報取得
-        token, jira_url, headers = get_auth_info()
+# 同期対象のワークブックと処理用のデータ（DataFrame・行の索引・変更の記録）
+class SyncWorkbook:
+    def __init__(self, excel_path):
+        self.path = excel_path
+        # Excelファイルを1回だけ読み込み。ファイルがなければ空のテンプレートを作成
+        self.file_exists = os.path.isfile(excel_path)
+        self.wb, self.ws, df, self.header_values = load_sync_workbook(excel_path)
+        other_sheets = [name for name in self.wb.sheetnames if name != self.ws.title]
+        logger.info(f"保持する追加シート: {', '.join(other_sheets) if other_sheets else 'なし'}")
         
-        # Excelファイルが存在するか確認
-        file_exists = os.path.isfile(excel_path)
-        
-        # 既存のファイルからImagesシートなどを保存（ファイルがある場合）
-        other_sheets = {}
-        if file_exists:
-            try:
-                existing_wb = load_workbook(excel_path)
-                # 最初のシート（メインシート）以外のシートを保存
-                main_sheet_name = existing_wb.sheetnames[0]
-                for sheet_name in existing_wb.sheetnames:
-                    if sheet_name != main_sheet_name:
-                        other_sheets[sheet_name] = existing_wb[sheet_name]
-                logger.info(f"保存する追加シート: {', '.join(other_sheets.keys()) if other_sheets else 'なし'}")
-            except Exception as e:
-                logger.error(f"既存シートの読み込みエラー: {str(e)}")
-        
-        # Excelファイルを読み込み。ファイルがなければ空のテンプレートを作成
-        try:
-            df = pd.read_excel(excel_path)
-        except FileNotFoundError:
-            df = pd.DataFrame(columns=["No.", "Ticket URL", "Summary", "Assignee", "Description", "Due Date", "Comment"])
-        
-        # 欠けている列の初期化
+        # 欠けている列の初期化（列が追加された場合はシート全体を書き直す）
+        self.changes = SheetChanges(len(df) if self.file_exists else 0)
         if "Status" not in df.columns:
             df["Status"] = ""
+            self.changes.structure_changed = True
         if "Sync" not in df.columns:
             df.insert(df.columns.get_loc("Comment") + 1, "Sync", "〇")
+            self.changes.structure_changed = True
         if "Ticket URL" not in df.columns:
             df["Ticket URL"] = ""
+            self.changes.structure_changed = True
         
         # URL列からキー列を追加（処理用）
         df["Ticket Key"] = df["Ticket URL"].apply(extract_key)
+        self.df = df
         
-        # 処理統計用変数
-        created_keys = set()
-        updated_keys = set()
+        # No.→行・キー→行の索引を作成
+        self.row_index = RowIndex(df)
+
+    # 変更をメインシートへ反映し、書式設定後に1回だけ保存する
+    def save(self, metrics=None):
+        metrics = metrics or SyncMetrics()
+        # 一時列削除
+        df = self.df.drop(columns=["Ticket Key"])
         
-        # Excel行ごとの処理
-        if "No." in df.columns:
-            if df["No."].dropna().empty:
-                max_no = 0
-            else:
-                max_no = int(df["No."].dropna().max())
-                
-            for no in range(1, max_no + 1):
-                matched = df[df["No."] == no]
-                if matched.empty:
-                    continue
-                    
-                idx = matched.index[0]
-                row = df.loc[idx]
-                
-                # Doneチケットはスキップ
-                if str(row.get("Status", "")).strip().lower() == "done":
-                    continue
-                
-                # Syncが〇でないものは対象外
-                if str(row.get("Sync", "")).strip() != "〇":
-                    continue
-                
-                summary_value = str(row.get("Summary", "")).strip()
-                key = row.get("Ticket Key")
-                
-                # チケットURLがない → 新規作成処理
-                if summary_value and (not key or key.strip() == ""):
-                    success, new_key = create_jira_ticket(jira_url, headers, project_key, row, idx, df)
-                    if success and new_key:
-                        created_keys.add(new_key)
-                
-                # 既存のチケットがある → 更新処理
-                elif key and key.strip():
-                    assignee = row["Assignee"] if pd.notna(row["Assignee"]) else ""
-                    is_subaru = assignee.strip().lower() == "subaru"
-                    sync_value = str(row.get("Sync", "")).strip()
-                    
-                    # 担当者がSubaruで、Syncが〇のもののみ更新対象
-                    if not is_subaru:
-                        logger.info(f"スキップ (Subaru以外): {key}")
-                        continue
-                    
-                    # Syncが〇の場合のみ更新
-                    if sync_value == "〇":
-                        success = update_jira_ticket(jira_url, headers, project_key, row, idx, df, key)
-                        if success:
-                            updated_keys.add(key)
-                    else:
-                        logger.info(f"スキップ (Syncなし): {key}")
-                        continue
+        # 変更がなければワークブックには触れない
+        if self.file_exists and not self.changes.has_changes(df):
+            logger.info("変更がないためExcelの保存をスキップします")
+            return
         
-        # JIRAからチケットをインポートして既存チケットも更新
-        df, added_count, updated_count = import_jira_tickets(jira_url, headers, project_key, df)
+        # 読み込んだワークブックのメインシートのセル値のみ書き換える
+        # （画像シート・J列のハイパーリンク・書式はそのまま残る）
+        if self.changes.structure_changed:
+            with metrics.phase("save"):
+                write_main_sheet(self.ws, df, self.header_values)
+            with metrics.phase("format"):
+                format_main_sheet(self.ws)
+        else:
+            # 変更したセルと追加行のみ書き込み、書式は追加行にのみ設定する
+            with metrics.phase("save"):
+                new_rows = patch_main_sheet(self.ws, df, self.changes)
+            with metrics.phase("format"):
+                format_main_sheet(self.ws, new_rows)
+            logger.info(f"変更セル: {len(self.changes.cells)}件、追加行: {len(new_rows)}行")
+        with metrics.phase("save"):
+            save_workbook_atomic(self.wb, self.path)
+        logger.info("✓ Excel書式設定完了")
         
-        # 統計情報をログ出力
-        logger.info("=" * 30)
-        logger.info(f"同期処理結果サマリー:")
-        logger.info(f"  作成したチケット数: {len(created_keys)}")
-        logger.info(f"  更新したチケット数: {len(updated_keys)}")
-        logger.info(f"  インポートしたチケット数: {added_count}")
-        logger.info(f"  JIRAからの更新数: {updated_count}")
+        # 保存した内容を基準に、以降の変更を記録し直す（監視モードで同じワークブックを続けて使う）
+        self.file_exists = True
+        self.changes = SheetChanges(len(self.df))
+
+# Excel行ごとの処理内容を決定する（DataFrameの読み取りのみ）
+def plan_push_tasks(book, project_key, state, full_scan=False):
+    df = book.df
+    
+    # Doneチケット・Syncが〇でないものは対象外（列単位でまとめて判定）
+    pending = (df["Status"].astype(str).str.strip().str.lower() != "done") & \
+              (df["Sync"].astype(str).str.strip() == "〇")
+    pending_indices = set(df.index[pending.to_numpy()])
+    
+    tasks = []
+    if "No." not in df.columns:
+        return tasks
+    
+    ordered = book.row_index.ordered_indices()
+    # 同期対象なのにNo.が1以上の整数でない行は処理されないため知らせる
+    skipped = sorted(pending_indices - set(ordered))
+    if skipped:
+        logger.warning(f"No.が1以上の整数でないため同期しない行: {', '.join(str(idx + 2) for idx in skipped)}行目")
+    
+    for idx in ordered:
+        if idx not in pending_indices:
+            continue
+        row = df.loc[idx]
         
-        # 一時列削除
-        df.drop(columns=["Ticket Key"], inplace=True)
-
-        # 既存のExcelファイルが存在する場合、ハイパーリンクとシートを保持した更新を行う
-        if file_exists:
-            # 一時的な新しいファイル名（拡張子をexcelと同じにする）
-            file_path_without_ext = os.path.splitext(excel_path)[0]
-            temp_file = file_path_without_ext + "_tmp.xlsx"
-            backup_file = file_path_without_ext + "_backup.xlsx"
-            
-            # バックアップとして元のファイルをコピー（画像保持のため）
-            copy(excel_path, backup_file)
-            
-            # まず新しいDataFrameを一時ファイルに保存
-            df.to_excel(temp_file, index=False)
-            
-            # 既存のワークブックを読み込む
-            existing_wb = load_workbook(excel_path)
-            existing_sheet = existing_wb.active
-            
-            # 新しいワークブックを読み込む
-            new_wb = load_workbook(temp_file)
-            new_sheet = new_wb.active
-            
-            # J列のセルをコピー（ハイパーリンクを保持）
-            for row in range(1, existing_sheet.max_row + 1):
-                # J列にデータがある場合
-                if row <= existing_sheet.max_row and existing_sheet.cell(row=row, column=10).value is not None:
-                    # 対応する行が新しいシートに存在するかチェック
-                    if row <= new_sheet.max_row:
-                        # J列のセルをコピー（ハイパーリンク情報を含む）
-                        new_sheet.cell(row=row, column=10).value = existing_sheet.cell(row=row, column=10).value
-                        # ハイパーリンクがある場合それも保持
-                        if existing_sheet.cell(row=row, column=10).hyperlink:
-                            new_sheet.cell(row=row, column=10).hyperlink = existing_sheet.cell(row=row, column=10).hyperlink
+        summary_value = str(row.get("Summary", "")).strip()
+        key = row.get("Ticket Key")
+        
+        # チケットURLがない → 新規作成処理
+        if summary_value and (not key or key.strip() == ""):
+            tasks.append(RowTask("create", idx, row))
+        
+        # 既存のチケットがある → 更新処理
+        elif key and key.strip():
+            assignee = row["Assignee"] if pd.notna(row["Assignee"]) else ""
+            is_subaru = assignee.strip().lower() == "subaru"
+            sync_value = str(row.get("Sync", "")).strip()
             
-            # 更新された内容を元のファイル名で保存
-            new_wb.save(excel_path)
+            # 担当者がSubaruで、Syncが〇のもののみ更新対象
+            if not is_subaru:
+                tasks.append(RowTask("skip", message=f"スキップ (Subaru以外): {key}"))
+                continue
             
-            # 画像を含むシートがある場合は特別な処理
-            if any("Imanges" in sheet_name for sheet_name in other_sheets.keys()):
-                logger.info("画像を含むシートを検出しました。元のファイルを保持します。")
-                try:
-                    # バックアップから元のワークブックを読み込む
-                    original_wb = load_workbook(backup_file)
-                    # 新しく作成したワークブックを読み込む
-                    updated_wb = load_workbook(excel_path)
-                    
-                    # 最初のシート（メインシート）のデータを更新
-                    new_main_sheet = updated_wb.active
-                    original_main_sheet = original_wb.active
-                    
-                    # メインシートを削除して新しいものに置き換え
-                    main_sheet_name = original_wb.sheetnames[0]
-                    del original_wb[main_sheet_name]
-                    
-                    # シートをコピー
-                    original_wb.create_sheet(main_sheet_name, 0)
-                    replaced_sheet = original_wb[main_sheet_name]
-                    
-                    # セルの内容をコピー
-                    for row in range(1, new_main_sheet.max_row + 1):
-                        for col in range(1, new_main_sheet.max_column + 1):
-                            replaced_sheet.cell(row=row, column=col).value = new_main_sheet.cell(row=row, column=col).value
-                            
-                            # ハイパーリンクもコピー
-                            if new_main_sheet.cell(row=row, column=col).hyperlink:
-                                replaced_sheet.cell(row=row, column=col).hyperlink = new_main_sheet.cell(row=row, column=col).hyperlink
-                                
-                            # スタイルもコピー
-                            try:
-                                if new_main_sheet.cell(row=row, column=col).has_style:
-                                    replaced_sheet.cell(row=row, column=col).font = new_main_sheet.cell(row=row, column=col).font
-                                    replaced_sheet.cell(row=row, column=col).border = new_main_sheet.cell(row=row, column=col).border
-                                    replaced_sheet.cell(row=row, column=col).fill = new_main_sheet.cell(row=row, column=col).fill
-                                    replaced_sheet.cell(row=row, column=col).number_format = new_main_sheet.cell(row=row, column=col).number_format
-                                    replaced_sheet.cell(row=row, column=col).alignment = new_main_sheet.cell(row=row, column=col).alignment
-                            except Exception as style_error:
-                                logger.warning(f"メインシートスタイルのコピー中にエラー: {style_error}")
-                    
-                    # 元のファイルに保存
-                    original_wb.save(excel_path)
-                    logger.info(f"画像を保持したまま、メインシートを更新しました")
-                    
-                except Exception as e:
-                    logger.error(f"画像保持処理エラー: {str(e)}")
-                    logger.info("通常の保存処理にフォールバックします")
-                    
-                    # 通常の保存処理（画像は失われるがデータは保持される）
-                    df.to_excel(excel_path, index=False)
-                    format_excel_file(excel_path)
+            # Syncが〇の場合のみ更新
+            if sync_value == "〇":
+                # 前回送信時と内容が同じ場合は送信しない
+                if not full_scan and state.get_hash(key) == row_content_hash(row, project_key):
+                    tasks.append(RowTask("unchanged", idx, row, key))
+                else:
+                    tasks.append(RowTask("update", idx, row, key))
             else:
-                # 保存していた他のシートを新しいワークブックに追加
-                for sheet_name, sheet in other_sheets.items():
-                    # すでに同名のシートがある場合は削除
-                    if sheet_name in new_wb.sheetnames:
-                        std = new_wb[sheet_name]
-                        new_wb.remove(std)
-                    
-                    # シートを新しいワークブックにコピー
-                    new_sheet = new_wb.create_sheet(title=sheet_name)
-                    
-                    # シートの内容をコピー
-                    for row_idx, row in enumerate(sheet.rows, 1):
-                        for col_idx, cell in enumerate(row, 1):
-                            new_cell = new_sheet.cell(row=row_idx, column=col_idx)
-                            # セルの値をコピー
-                            new_cell.value = cell.value
-                            # ハイパーリンクをコピー
-                            if cell.hyperlink:
-                                new_cell.hyperlink = cell.hyperlink
-                            
-                            # スタイルのコピーは個別に行う（styleproxyはハッシュ化できないため）
-                            try:
-                                # フォント
-                                if cell.font:
-                                    new_cell.font = styles.Font(
-                                        name=cell.font.name,
-                                        size=cell.font.size,
-                                        bold=cell.font.bold,
-                                        italic=cell.font.italic,
-                                        vertAlign=cell.font.vertAlign,
-                                        underline=cell.font.underline,
-                                        strike=cell.font.strike,
-                                        color=cell.font.color
-                                    )
-                                # 罫線
-                                if cell.border:
-                                    new_cell.border = styles.Border(
-                                        left=styles.Side(style=cell.border.left.style, color=cell.border.left.color) if cell.border.left else None,
-                                        right=styles.Side(style=cell.border.right.style, color=cell.border.right.color) if cell.border.right else None,
-                                        top=styles.Side(style=cell.border.top.style, color=cell.border.top.color) if cell.border.top else None,
-                                        bottom=styles.Side(style=cell.border.bottom.style, color=cell.border.bottom.color) if cell.border.bottom else None
-                                    )
-                                # 塗りつぶし
-                                if cell.fill:
-                                    new_cell.fill = styles.PatternFill(
-                                        fill_type=cell.fill.fill_type,
-                                        start_color=cell.fill.start_color,
-                                        end_color=cell.fill.end_color
-                                    )
-                                # 数値書式
-                                new_cell.number_format = cell.number_format
-                                # 配置
-                                if cell.alignment:
-                                    new_cell.alignment = cell.alignment
-                            except Exception as style_error:
-                                logger.warning(f"セルスタイルのコピー中にエラー: {style_error}")
-                                # スタイルコピーのエラーは無視して続行
-                    
-                    # 列の幅をコピー
-                    for col_idx, col in enumerate(sheet.columns, 1):
-                        letter = openpyxl.utils.get_column_letter(col_idx)
-                        if sheet.column_dimensions[letter].width is not None:
-                            new_sheet.column_dimensions[letter].width = sheet.column_dimensions[letter].width
-                    
-                    # 行の高さをコピー
-                    for row_idx in range(1, sheet.max_row + 1):
-                        if sheet.row_dimensions[row_idx].height is not None:
-                            new_sheet.row_dimensions[row_idx].height = sheet.row_dimensions[row_idx].height
-                
-                # 更新された内容を元のファイル名で保存
-                new_wb.save(excel_path)
-            
-            # 一時ファイルとバックアップを削除
-            try:
-                os.remove(temp_file)
-                os.remove(backup_file)
-            except Exception as e:
-                logger.warning(f"一時ファイル削除エラー: {str(e)}")
-            
-            # 書式の調整（メインシートのみ）
-            format_excel_file(excel_path)
-        else:
-            # 新規ファイルの場合は通常の保存
-            df.to_excel(excel_path, index=False)
-            format_excel_file(excel_path)
+                tasks.append(RowTask("skip", message=f"スキップ (Syncなし): {key}"))
+    return tasks
+
+# 更新対象チケットの現在値をまとめて取得し、タスクに付与する
+def attach_snapshots(client, tasks):
+    # 変更のない行もAssigneeをJIRAの値に戻すため、同じ検索でまとめて取得する
+    kinds = ("update", "unchanged")
+    update_keys = [task.key for task in tasks if task.kind in kinds]
+    if not update_keys:
+        return tasks
+    snapshots = fetch_issue_snapshots(client, update_keys)
+    return [task._replace(snapshot=snapshots.get(task.key)) if task.kind in kinds else task
+            for task in tasks]
+
+# 作成・更新を実行し、DataFrameへの書き込みはメインスレッドで行順に反映
+# 戻り値: (作成したキー, 更新したキー, 送信に成功したチケットの内容ハッシュ)
+def run_push_tasks(client, project_key, book, tasks, workers=1):
+    created_keys = set()
+    updated_keys = set()
+    pushed_hashes = {}
+    for task, (success, result_key, updates) in execute_row_tasks(client, project_key, tasks, workers):
+        apply_row_updates(book.df, task.idx, updates, book.changes)
+        if updates.get("Ticket Key"):
+            book.row_index.set_key(updates["Ticket Key"], task.idx)
+        if success and result_key:
+            pushed_hashes[result_key] = row_content_hash(task.row, project_key)
+            if task.kind == "create":
+                created_keys.add(result_key)
+            else:
+                updated_keys.add(result_key)
+    return created_keys, updated_keys, pushed_hashes
+
+# 統計情報をログ出力
+def log_sync_summary(created_count, updated_count, added_count, imported_update_count):
+    logger.info("=" * 30)
+    logger.info(f"同期処理結果サマリー:")
+    logger.info(f"  作成したチケット数: {created_count}")
+    logger.info(f"  更新したチケット数: {updated_count}")
+    logger.info(f"  インポートしたチケット数: {added_count}")
+    logger.info(f"  JIRAからの更新数: {imported_update_count}")
+
+# 同期状態の読み込み
+# 戻り値: (状態ストア, 前回同期開始時刻以降のみ取得する場合はその日時)
+def open_sync_state(excel_path, full_scan=False):
+    state = SyncState(get_sync_state_path(excel_path))
+    watermark = None if full_scan else state.get_watermark()
+    updated_since = watermark - WATERMARK_MARGIN if watermark else None
+    if updated_since:
+        logger.info(f"差分同期: {updated_since.isoformat(timespec='seconds')} 以降の更新を取得します")
+    return state, updated_since
+
+# 保存完了後に同期状態を記録（watermarkがNoneの場合はウォーターマークを進めない）
+# usersを指定した場合は、新しく取得したユーザー情報も保存する
+def record_sync_state(state, pushed_hashes, watermark, users=None):
+    state.set_hashes(pushed_hashes)
+    if users is not None:
+        users.save(state)
+    if watermark is not None:
+        state.set_watermark(watermark)
+    state.commit()
+
+# 変更のない実行を省略するための記録（同期状態のmetaに保存する）
+FAST_PATH_META = "fast_path"
+
+# 前回の同期をすべて完了した後の状態を記録する
+# ワークブックは保存後のファイルの状態、JIRAは同期開始前の件数と最終更新日時
+# （同期中の自分の更新で値が変わるため、次回は1回だけ通常の同期を行い、以降は省略できるようになる）
+def record_fast_path(state, excel_path, project_key, jira_probe):
+    signature = get_file_signature(excel_path)
+    if jira_probe is None or signature is None:
+        return
+    state.set_meta(FAST_PATH_META, json.dumps({"project_key": project_key, "workbook": list(signature),
+                                               "jira": list(jira_probe)}))
+    state.commit()
+
+# 前回の同期からExcel・JIRAとも変更がなければTrue（pandas・openpyxlを読み込まずに判定する）
+# 前回の同期がすべて成功し、ワークブックが前回保存時のままで、JIRAの件数と最終更新日時も変わっていない場合のみ
+def is_sync_unchanged(excel_path, project_key, client):
+    state_path = get_sync_state_path(excel_path)
+    if not os.path.isfile(state_path):
+        return False
+    state = SyncState(state_path)
+    try:
+        value = state.get_meta(FAST_PATH_META)
+    finally:
+        state.close()
+    if not value:
+        return False
+    record = json.loads(value)
+    signature = get_file_signature(excel_path)
+    if record["project_key"] != project_key or signature is None or list(signature) != record["workbook"]:
+        return False
+    probe = probe_jira_updates(client, project_key)
+    return probe is not None and list(probe) == record["jira"]
+
+# 接続プール付きクライアントを作成
+def create_client(workers=1, rate_limit=None, metrics=None):
+    return JiraClient.from_auth_info(pool_size=max(DEFAULT_POOL_SIZE, workers),
+                                     scheduler=RequestScheduler(rate_limit), metrics=metrics)
+
+# 計測結果をログ出力し、ファイルに保存する
+def finish_metrics(metrics, metrics_path):
+    metrics.log_summary()
+    if not metrics_path:
+        return
+    try:
+        metrics.write(metrics_path)
+        logger.info(f"計測結果を保存しました: {metrics_path}")
+    except Exception as e:
+        logger.error(f"計測結果の保存失敗: {str(e)}")
+
+# ExcelとJIRAを同期する主関数
+# clientを渡さない場合はget_auth_info()から接続プール付きクライアントを作成する
+# workers > 1 でExcel→JIRAの作成・更新を並列実行する
+# rate_limitで全ワーカー合計の毎秒リクエスト数の上限を指定する
+# 通常は同期状態ファイルを使った差分同期を行い、full_scan=Trueで全件を再確認する
+# フェーズごとの所要時間とHTTPリクエストをmetricsに記録し、metrics_pathを指定するとファイルに保存する
+# bookに読み込み済みのSyncWorkbookを渡すとExcelを読み直さずに使う（保存後は次の同期に使える状態になる）
+def sync_excel_and_jira(excel_path, project_key, client=None, workers=1, full_scan=False,
+                        rate_limit=None, metrics=None, metrics_path=None, book=None):
+    logger.info("ExcelとJIRAの同期処理を開始します")
+    
+    metrics = metrics or SyncMetrics()
+    metrics.info.update(excel_path=os.path.abspath(excel_path), project_key=project_key,
+                        workers=workers, success=False)
+    own_client = client is None
+    state = None
+    try:
+        # JIRA認証情報取得（接続プール付きクライアント）
+        # 渡されたクライアントは接続を共有したまま、この同期のmetricsに記録する
+        with metrics.phase("auth"):
+            if own_client:
+                client = create_client(workers, rate_limit, metrics)
+            elif client.metrics is None:
+                client = client.with_metrics(metrics)
+        
+        # 差分同期の状態を読み込み（前回同期開始時刻以降に更新されたチケットのみ取得する）
+        # 同期開始時刻はJIRAサーバの時刻で記録する（このホストとのタイムゾーン・時計のずれの影響を受けない）
+        run_started = get_jira_server_time(client)
+        with metrics.phase("state"):
+            state, updated_since = open_sync_state(excel_path, full_scan)
+            client.users.load(state)
+            # 同期が完了するまでは変更のない実行の省略を無効にする
+            state.set_meta(FAST_PATH_META, "")
+            state.commit()
+        with metrics.phase("probe"):
+            jira_probe = probe_jira_updates(client, project_key)
         
+        # 読み込み済みのワークブック（監視モードで保持しているもの）があれば読み直さない
+        with metrics.phase("excel_read"):
+            book = book or SyncWorkbook(excel_path)
+        
+        # Excel→JIRAの作成・更新
+        with metrics.phase("plan"):
+            tasks = plan_push_tasks(book, project_key, state, full_scan)
+        with metrics.phase("snapshot"):
+            tasks = attach_snapshots(client, tasks)
+        with metrics.phase("push"):
+            created_keys, updated_keys, pushed_hashes = run_push_tasks(client, project_key, book, tasks, workers)
+        
+        # JIRAからチケットをインポートして既存チケットも更新
+        with metrics.phase("import"):
+            book.df, added_count, updated_count, import_ok = import_jira_tickets(
+                client, project_key, book.df, book.row_index, updated_since, book.changes, run_started)
+        
+        log_sync_summary(len(created_keys), len(updated_keys), added_count, updated_count)
+        metrics.info.update(created=len(created_keys), updated=len(updated_keys),
+                            imported=added_count, imported_updates=updated_count)
+        
+        book.save(metrics)
         logger.info("✓ Excel保存完了（同期処理）")
+        
+        # インポートが失敗した場合はウォーターマークを進めない
+        with metrics.phase("state"):
+            record_sync_state(state, pushed_hashes, run_started if import_ok else None, client.users)
+            # インポートと全チケットの作成・更新が成功した場合のみ、次回の省略を許可する
+            pushed_count = sum(1 for task in tasks if task.kind in ("create", "update"))
+            if import_ok and pushed_count == len(created_keys) + len(updated_keys):
+                record_fast_path(state, excel_path, project_key, jira_probe)
+        metrics.info["success"] = True
         return True
         
     except Exception as e:
         logger.error(f"同期処理エラー: {str(e)}")
         return False
 
+    finally:
+        if state is not None:
+            state.close()
+        if own_client and client is not None:
+            client.close()
+        finish_metrics(metrics, metrics_path)
+
+# 同期計画のフォーマットのバージョン
+SYNC_PLAN_VERSION = 1
+
+# 同期計画に書き出すためにJSONで扱える値へ変換
+def to_plan_value(value):
+    if value is None:
+        return None
+    if isinstance(value, (list, tuple)):
+        return [to_plan_value(item) for item in value]
+    if isinstance(value, dict):
+        return {name: to_plan_value(item) for name, item in value.items()}
+    if pd.isna(value):
+        return None
+    if isinstance(value, (pd.Timestamp, datetime)):
+        return value.isoformat()
+    if isinstance(value, np.generic):
+        return value.item()
+    return value
+
+# 計画作成時と同じ行かを確認するための情報
+def plan_row_entry(row, idx, project_key):
+    return {
+        "row": int(idx),
+        "no": to_plan_value(row.get("No.")),
+        "key": row.get("Ticket Key") or None,
+        "row_hash": row_content_hash(row, project_key),
+    }
+
+# 実行時の行が計画作成時から変わっていないか確認する
+def plan_row_matches(book, entry, project_key):
+    idx = entry["row"]
+    if idx >= len(book.df):
+        return False
+    row = book.df.loc[idx]
+    return (to_plan_value(row.get("No.")) == entry["no"]
+            and (row.get("Ticket Key") or None) == entry["key"]
+            and str(row.get("Sync", "")).strip() == "〇"
+            and row_content_hash(row, project_key) == entry["row_hash"])
+
+# JIRAもワークブックも変更せずに同期計画を作成する（--plan）
+# 作成・更新・コメント追加・担当者の変更・インポートする行を、実際の同期と同じ規則で求める
+# 戻り値: 同期計画（JSONに変換できるdict）。失敗した場合はNone
+def plan_sync(excel_path, project_key, client=None, full_scan=False):
+    logger.info("同期計画を作成します（JIRA・Excelは変更しません）")
+    
+    own_client = client is None
+    state = None
+    try:
+        if own_client:
+            client = create_client()
+        
+        run_started = get_jira_server_time(client)
+        state, updated_since = open_sync_state(excel_path, full_scan)
+        client.users.load(state)
+        book = SyncWorkbook(excel_path)
+        
+        tasks = attach_snapshots(client, plan_push_tasks(book, project_key, state, full_scan))
+        push = []
+        skipped = []
+        for task in tasks:
+            if task.kind == "skip":
+                skipped.append(task.message)
+                continue
+            
+            entry = plan_row_entry(task.row, task.idx, project_key)
+            entry["action"] = task.kind
+            summary, description, due_date_str, comment = get_push_fields(task.row, project_key)
+            predicted = {"Sync": ""}  # 実行後にDataFrameへ書き込まれる内容の予測
+            if task.kind == "create":
+                entry["summary"] = summary
+                entry["post_comment"] = bool(comment)
+            elif task.kind == "update":
+                fields = {"summary": summary, "description": description, "duedate": due_date_str}
+                snapshot = task.snapshot
+                if snapshot is not None:
+                    fields = get_changed_fields(fields, snapshot)
+                    if snapshot["last_comment"] is not None:
+                        entry["post_comment"] = bool(comment) and snapshot["last_comment"] != comment
+                    else:
+                        entry["post_comment"] = None  # 実行時にコメントを取得して判定する
+                else:
+                    entry["post_comment"] = None
+                entry["fields"] = fields
+            if task.kind in ("update", "unchanged"):
+                # 更新・変更なしのどちらも、実行時にAssigneeをJIRAの値に戻す
+                if task.snapshot is not None:
+                    assignee_name = get_jira_assignee_name(task.snapshot, client.users)
+                    if assignee_name:
+                        predicted["Assignee"] = assignee_name
+                        entry["assignee"] = assignee_name
+                entry["snapshot"] = to_plan_value(task.snapshot)
+            push.append(entry)
+            # インポートの判定は作成・更新後の状態に対して行うため、予測した内容を反映しておく
+            apply_row_updates(book.df, task.idx, predicted)
+        
+        # インポートは読み取りのみ。既存行への書き込みと追加行を計画として記録する
+        import_changes = SheetChanges(len(book.df))
+        df, added_count, updated_count, import_ok = import_jira_tickets(
+            client, project_key, book.df, book.row_index, updated_since, import_changes, run_started)
+        added_rows = [{column: to_plan_value(row[column]) for column in IMPORT_COLUMNS}
+                      for _, row in df.iloc[import_changes.loaded_rows:].iterrows()]
+        cell_updates = [{"row": int(idx), "key": df.at[idx, "Ticket Key"], "column": column,
+                         "value": to_plan_value(df.at[idx, column])}
+                        for idx, column in sorted(import_changes.cells)]
+        
+        plan = {
+            "version": SYNC_PLAN_VERSION,
+            "excel_path": os.path.abspath(excel_path),
+            "project_key": project_key,
+            "started_at": run_started.isoformat(),
+            "updated_since": updated_since.isoformat() if updated_since else None,
+            "import_ok": import_ok,
+            "summary": {
+                "create": sum(1 for entry in push if entry["action"] == "create"),
+                "update": sum(1 for entry in push if entry["action"] == "update"),
+                "unchanged": sum(1 for entry in push if entry["action"] == "unchanged"),
+                "post_comment": sum(1 for entry in push if entry.get("post_comment")),
+                "skip": len(skipped),
+                "import_add": added_count,
+                "import_update": len(cell_updates),
+            },
+            "push": push,
+            "skipped": skipped,
+            "import": {"added": added_rows, "cell_updates": cell_updates},
+        }
+        logger.info(f"同期計画: {json.dumps(plan['summary'], ensure_ascii=False)}")
+        return plan
+        
+    except Exception as e:
+        logger.error(f"同期計画の作成エラー: {str(e)}")
+        return None
+
+    finally:
+        if state is not None:
+            state.close()
+        if own_client and client is not None:
+            client.close()
+
+# --planで作成した同期計画を実行する（--apply）
+# 計画作成後に内容が変わった行は実行せずにスキップする
+def apply_sync_plan(plan, client=None, workers=1, rate_limit=None, metrics=None, metrics_path=None):
+    if plan.get("version") != SYNC_PLAN_VERSION:
+        logger.error(f"同期計画のバージョンが一致しません: {plan.get('version')}")
+        return False
+    
+    excel_path = plan["excel_path"]
+    project_key = plan["project_key"]
+    logger.info(f"同期計画を実行します: {excel_path} ({project_key})")
+    
+    metrics = metrics or SyncMetrics()
+    metrics.info.update(excel_path=excel_path, project_key=project_key, workers=workers,
+                        success=False, plan=True)
+    own_client = client is None
+    state = None
+    try:
+        with metrics.phase("auth"):
+            if own_client:
+                client = create_client(workers, rate_limit, metrics)
+        
+        with metrics.phase("state"):
+            state = SyncState(get_sync_state_path(excel_path))
+            client.users.load(state)
+        with metrics.phase("excel_read"):
+            book = SyncWorkbook(excel_path)
+        
+        # 計画どおりの行のみ作成・更新する（更新は計画作成時のJIRAの値との差分を送信する）
+        tasks = []
+        for entry in plan["push"]:
+            if not plan_row_matches(book, entry, project_key):
+                logger.warning(f"計画作成後に変更されたためスキップ: No.{entry['no']} {entry['key'] or ''}")
+                continue
+            row = book.df.loc[entry["row"]]
+            tasks.append(RowTask(entry["action"], entry["row"], row, entry["key"], snapshot=entry.get("snapshot")))
+        with metrics.phase("push"):
+            created_keys, updated_keys, pushed_hashes = run_push_tasks(client, project_key, book, tasks, workers)
+        
+        # インポート: 既存行への書き込み（同じチケットの行のみ）と、まだ存在しないチケットの行の追加
+        import_started = time.perf_counter()
+        updated_count = 0
+        for update in plan["import"]["cell_updates"]:
+            if book.row_index.key_to_idx.get(update["key"]) != update["row"]:
+                logger.warning(f"計画作成後に行が変わったためスキップ: {update['key']}")
+                continue
+            set_cell(book.df, update["row"], update["column"], update["value"], book.changes)
+            updated_count += 1
+        new_rows = {column: [] for column in IMPORT_COLUMNS}
+        for added in plan["import"]["added"]:
+            if added["Ticket Key"] in book.row_index.key_to_idx:
+                continue
+            for column in IMPORT_COLUMNS:
+                new_rows[column].append(added[column])
+        added_count = len(new_rows["Ticket Key"])
+        if added_count:
+            book.df = append_imported_rows(book.df, new_rows, book.row_index)
+        metrics.phases["import"] = time.perf_counter() - import_started
+        
+        log_sync_summary(len(created_keys), len(updated_keys), added_count, updated_count)
+        metrics.info.update(created=len(created_keys), updated=len(updated_keys),
+                            imported=added_count, imported_updates=updated_count)
+        
+        book.save(metrics)
+        logger.info("✓ Excel保存完了（同期計画の実行）")
+        
+        watermark = datetime.fromisoformat(plan["started_at"]) if plan["import_ok"] else None
+        with metrics.phase("state"):
+            record_sync_state(state, pushed_hashes, watermark, client.users)
+        metrics.info["success"] = True
+        return True
+        
+    except Exception as e:
+        logger.error(f"同期計画の実行エラー: {str(e)}")
+        return False
+
+    finally:
+        if state is not None:
+            state.close()
+        if own_client and client is not None:
+            client.close()
+        finish_metrics(metrics, metrics_path)
+
+# 一括同期時にログへワークブックの名前を付けるためのスレッドごとの情報
+log_context = threading.local()
+
+# 一括同期中のログの先頭に、処理中のプロジェクトキーとワークブックの名前を付ける
+class BatchLogFilter(logging.Filter):
+    def filter(self, record):
+        label = getattr(log_context, "label", None)
+        if label:
+            record.msg = f"[{label}] {record.msg}"
+        return True
+
+# 一括同期のマニフェスト（JSON）を読み込む
+# [{"excel_path": "a.xlsx", "project_key": "ABC", "full": false}, ...] の形式で、
+# 相対パスはマニフェストのあるディレクトリを基準にする
+def load_batch_manifest(manifest_path):
+    with open(manifest_path, encoding="utf-8") as f:
+        entries = json.load(f)
+    base_dir = os.path.dirname(os.path.abspath(manifest_path))
+    jobs = []
+    seen = set()
+    for entry in entries:
+        excel_path = os.path.join(base_dir, entry["excel_path"])
+        if excel_path in seen:
+            raise ValueError(f"同じワークブックが複数回指定されています: {entry['excel_path']}")
+        seen.add(excel_path)
+        jobs.append({"excel_path": excel_path, "project_key": entry["project_key"],
+                     "full": bool(entry.get("full", False))})
+    return jobs
+
+# 一括同期で同時に処理するワークブック数の既定値
+DEFAULT_BATCH_JOBS = 4
+
+# 複数のワークブックを1プロセスで並行して同期する
+# 同時に処理するワークブックはbatch_jobs件まで、各ワークブックの作成・更新はworkers並列で行う
+# 認証済みの接続プールとスケジューラを全ワークブックで共有し、
+# 同時に送信するリクエスト数は全体でmax_in_flight件（省略時はbatch_jobs × workers）までに制限する
+# 戻り値: ワークブックごとの結果（計測結果のレポート）のリスト
+def run_batch_sync(jobs, workers=1, rate_limit=None, batch_jobs=DEFAULT_BATCH_JOBS, max_in_flight=None):
+    batch_jobs = max(1, min(len(jobs), batch_jobs))
+    max_in_flight = max_in_flight or batch_jobs * workers
+    logger.info(f"一括同期を開始します: {len(jobs)}件（同時処理数: {batch_jobs}、同時リクエスト数の上限: {max_in_flight}）")
+    client = JiraClient.from_auth_info(pool_size=max(DEFAULT_POOL_SIZE, max_in_flight),
+                                       scheduler=RequestScheduler(rate_limit, max_in_flight=max_in_flight))
+    log_filter = BatchLogFilter()
+    logger.addFilter(log_filter)
+
+    def run(job):
+        log_context.label = f"{job['project_key']}:{os.path.basename(job['excel_path'])}"
+        metrics = SyncMetrics()
+        try:
+            sync_excel_and_jira(job["excel_path"], job["project_key"], client=client, workers=workers,
+                                full_scan=job["full"], metrics=metrics,
+                                metrics_path=get_metrics_path(job["excel_path"]))
+        finally:
+            log_context.label = None
+        return metrics.report()
+
+    try:
+        with ThreadPoolExecutor(max_workers=batch_jobs) as executor:
+            results = list(executor.map(run, jobs))
+    finally:
+        logger.removeFilter(log_filter)
+        client.close()
+
+    # ワークブックごとの結果をログ出力
+    logger.info("=" * 30)
+    logger.info("一括同期結果:")
+    for result in results:
+        logger.info(f"  {'✓' if result['success'] else '✗'} {result['project_key']} "
+                    f"({os.path.basename(result['excel_path'])}): "
+                    f"作成 {result.get('created', 0)}、更新 {result.get('updated', 0)}、"
+                    f"インポート {result.get('imported', 0)}、JIRAからの更新 {result.get('imported_updates', 0)}、"
+                    f"{result['total_seconds']:.1f}秒、HTTP {result['http_requests']}件")
+    return results
+
+# 監視モードの設定
+WATCH_TICK = 1.0  # Excelファイルの変更を確認する間隔（秒）
+DEFAULT_WATCH_INTERVAL = 30.0  # JIRAの更新を確認する間隔（秒）
+DEFAULT_WATCH_DEBOUNCE = 3.0  # Excelファイルの変更が止まってから同期するまでの待ち時間（秒）
+WATCH_RETRY_BASE = 10.0  # 同期に失敗した場合の再試行までの待ち時間（秒、失敗が続くと倍にする）
+WATCH_RETRY_MAX = 300.0  # 再試行までの待ち時間の上限（秒）
+
+# Excelファイルの変更とJIRAの更新を監視し、変更があったときだけ差分同期を行う（--watch）
+# - Excelファイルはinode・更新日時・サイズを確認し、変更が止まってからdebounce秒後に同期する
+# - JIRAはinterval秒ごとに件数と最終更新日時のみを問い合わせる（1リクエスト）
+# - 同期後のワークブック（DataFrame・行の索引）はメモリに保持し、ファイルが変わらなければ読み直さない
+# stop_eventをセットすると終了する（Ctrl+Cでも終了する）
+def watch_and_sync(excel_path, project_key, workers=1, rate_limit=None, interval=DEFAULT_WATCH_INTERVAL,
+                   debounce=DEFAULT_WATCH_DEBOUNCE, metrics_path=None, stop_event=None):
+    stop_event = stop_event or threading.Event()
+    logger.info(f"監視モードを開始します: {excel_path} ({project_key})、JIRA確認間隔 {interval}秒")
+    client = create_client(workers, rate_limit)
+    book = None
+    book_signature = None  # bookの内容と一致するExcelファイルの状態
+    jira_baseline = None  # 前回同期時のJIRAの件数と最終更新日時
+    pending_signature = None  # 変更を検出した後、まだ同期していないExcelファイルの状態
+    pending_since = None
+    next_probe = 0.0
+    failures = 0  # 連続して失敗した同期の回数
+    retry_at = None  # 失敗した同期を再試行する時刻
+    reason = "起動時の同期"
+    try:
+        while not stop_event.is_set():
+            now = time.monotonic()
+            
+            # Excelファイルの変更（保存が続いている間は待つ）
+            signature = get_file_signature(excel_path)
+            if reason is None and signature != book_signature:
+                if signature != pending_signature:
+                    pending_signature = signature
+                    pending_since = now
+                elif now - pending_since >= debounce:
+                    reason = "Excelファイルの変更"
+            
+            # 失敗した同期の再試行（ワークブックやJIRAに変更がなくても同期し直す）
+            if reason is None and retry_at is not None and now >= retry_at:
+                reason = f"失敗した同期の再試行（{failures}回目）"
+            
+            # JIRAの更新（件数と最終更新日時が前回の同期時から変わっていれば同期する）
+            if reason is None and now >= next_probe:
+                next_probe = now + interval
+                probe = probe_jira_updates(client, project_key)
+                if probe is not None and probe != jira_baseline:
+                    reason = "JIRAの更新"
+            
+            if reason is None:
+                stop_event.wait(WATCH_TICK)
+                continue
+            
+            logger.info(f"同期を開始します（{reason}）")
+            # 同期中に自分で行う更新と区別するため、同期前の状態を基準にする
+            # （自分の更新で基準が変わった場合は次の確認で1回だけ差分同期が走り、以降は止まる）
+            jira_baseline = probe_jira_updates(client, project_key)
+            next_probe = time.monotonic() + interval
+            if book is not None and signature != book_signature:
+                book = None  # ファイルが外部で変更されたため読み直す
+            if book is None:
+                book = SyncWorkbook(excel_path)
+            
+            success = sync_excel_and_jira(excel_path, project_key, client=client, workers=workers,
+                                          metrics_path=metrics_path, book=book)
+            if success:
+                failures = 0
+                retry_at = None
+            else:
+                # 処理途中のデータは信用できないため次回は読み直す
+                # （保存先がExcelで開かれている、JIRAの一時的なエラーなど）待ち時間を延ばしながら再試行する
+                book = None
+                failures += 1
+                delay = min(WATCH_RETRY_MAX, WATCH_RETRY_BASE * (2 ** (failures - 1)))
+                retry_at = time.monotonic() + delay
+                logger.warning(f"同期に失敗したため {delay:.0f}秒後に再試行します")
+            book_signature = get_file_signature(excel_path)
+            pending_signature = None
+            reason = None
+    except KeyboardInterrupt:
+        pass
+    finally:
+        client.close()
+        logger.info("監視モードを終了します")
+
 # メイン関数
 def main():
-    if len(sys.argv) < 3:
-        print("使い方: python main.py [Excelファイルパス] [JIRAプロジェクトキー]")
-        sys.exit(1)
+    parser = argparse.ArgumentParser(description="ExcelとJIRAの同期")
+    parser.add_argument("excel_path", nargs="?", help="Excelファイルパス")
+    parser.add_argument("project_key", nargs="?", help="JIRAプロジェクトキー")
+    parser.add_argument("--workers", type=int, default=1,
+                        help="Excel→JIRAの作成・更新の並列数（--batchではワークブックごと、デフォルト: 1 = 逐次実行）")
+    parser.add_argument("--full", action="store_true",
+                        help="差分同期を行わず、全チケットを再確認する")
+    parser.add_argument("--rate-limit", type=float, default=None,
+                        help="JIRAへの毎秒リクエスト数の上限（全ワーカー合計、デフォルト: 無制限）")
+    parser.add_argument("--plan", action="store_true",
+                        help="JIRAとExcelを変更せずに同期計画をJSONで出力する（デフォルト: 標準出力）")
+    parser.add_argument("--plan-out", metavar="PLAN_JSON",
+                        help="--planの同期計画を保存するファイル（指定時は--planを省略できる）")
+    parser.add_argument("--apply", metavar="PLAN_JSON",
+                        help="--planで作成した同期計画を実行する")
+    parser.add_argument("--batch", metavar="MANIFEST_JSON",
+                        help="マニフェストに記載した複数のワークブックを1プロセスで並行して同期する")
+    parser.add_argument("--batch-jobs", type=int, default=DEFAULT_BATCH_JOBS,
+                        help=f"--batchで同時に同期するワークブック数（デフォルト: {DEFAULT_BATCH_JOBS}）")
+    parser.add_argument("--max-in-flight", type=int, default=None,
+                        help="--batchで全ワークブック合計の同時リクエスト数の上限（デフォルト: --batch-jobs × --workers）")
+    parser.add_argument("--watch", action="store_true",
+                        help="Excelファイルの変更とJIRAの更新を監視し、変更があったときに同期する")
+    parser.add_argument("--interval", type=float, default=DEFAULT_WATCH_INTERVAL,
+                        help=f"--watchでJIRAの更新を確認する間隔（秒、デフォルト: {DEFAULT_WATCH_INTERVAL:g}）")
+    parser.add_argument("--debounce", type=float, default=DEFAULT_WATCH_DEBOUNCE,
+                        help=f"--watchでExcelファイルの変更が止まってから同期するまでの秒数（デフォルト: {DEFAULT_WATCH_DEBOUNCE:g}）")
+    parser.add_argument("--metrics", metavar="PATH",
+                        help="フェーズごとの処理時間とHTTPリクエストの計測結果の保存先（.json/.csv、"
+                             "デフォルト: <Excelファイル名>_sync_metrics.json）")
+    parser.add_argument("--profile", metavar="PATH",
+                        help="cProfileのプロファイル結果を保存する（pstatsで表示できる形式）")
+    args = parser.parse_args()
+
+    if not args.apply and not args.batch and (not args.excel_path or not args.project_key):
+        parser.error("Excelファイルパスと JIRAプロジェクトキーを指定してください")
+
+    setup_logging()
+
+    profiler = None
+    if args.profile:
+        import cProfile
+        profiler = cProfile.Profile()
+        profiler.enable()
+
+    if args.batch:
+        try:
+            results = run_batch_sync(load_batch_manifest(args.batch), workers=args.workers,
+                                     rate_limit=args.rate_limit, batch_jobs=args.batch_jobs,
+                                     max_in_flight=args.max_in_flight)
+            success = all(result["success"] for result in results)
+        except Exception as e:
+            logger.error(f"一括同期エラー: {str(e)}")
+            success = False
+    elif args.apply:
+        with open(args.apply, encoding="utf-8") as f:
+            plan = json.load(f)
+        success = apply_sync_plan(plan, workers=args.workers, rate_limit=args.rate_limit,
+                                  metrics_path=args.metrics or get_metrics_path(plan["excel_path"]))
+    elif args.watch:
+        watch_and_sync(args.excel_path, args.project_key, workers=args.workers, rate_limit=args.rate_limit,
+                       interval=args.interval, debounce=args.debounce,
+                       metrics_path=args.metrics or get_metrics_path(args.excel_path))
+        success = True
+    elif args.plan or args.plan_out:
+        plan = plan_sync(args.excel_path, args.project_key, full_scan=args.full)
+        success = plan is not None
+        if success:
+            plan_json = json.dumps(plan, ensure_ascii=False, indent=2)
+            if args.plan_out:
+                with open(args.plan_out, "w", encoding="utf-8") as f:
+                    f.write(plan_json)
+                logger.info(f"同期計画を保存しました: {args.plan_out}")
+            else:
+                print(plan_json)
+    else:
+        client = None
+        try:
+            client = create_client(args.workers, args.rate_limit)
+            # 前回の同期からExcel・JIRAとも変更がなければ、ワークブックを読み込まずに終了する
+            if not args.full and is_sync_unchanged(args.excel_path, args.project_key, client):
+                logger.info("前回の同期からExcel・JIRAとも変更がないため同期を省略します")
+                success = True
+            else:
+                success = sync_excel_and_jira(args.excel_path, args.project_key, client=client,
+                                              workers=args.workers, full_scan=args.full,
+                                              metrics_path=args.metrics or get_metrics_path(args.excel_path))
+        except Exception as e:
+            logger.error(f"同期処理エラー: {str(e)}")
+            success = False
+        finally:
+            if client is not None:
+                client.close()
 
-    _, excel_path, project_key = sys.argv
-    success = sync_excel_and_jira(excel_path, project_key)
+    if profiler is not None:
+        profiler.disable()
+        profiler.dump_stats(args.profile)
+        logger.info(f"プロファイル結果を保存しました: {args.profile}")
     
     if not success:
         logger.error("同期処理が失敗しました")